@@ -0,0 +1,5 @@
+"""명언 메이커 렌더링 코어.
+
+Streamlit UI(app.py)와 분리된 모듈 모음. 무거운 라이브러리(MoviePy, NumPy, PIL)는
+렌더링에 필요한 모듈(text, background, video, render)을 불러올 때만 로드된다.
+"""
@@ -0,0 +1,109 @@
+"""기본 영상/폰트/음악 등 정적 자원 탐색"""
+
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import AVAILABLE_FONTS, DEFAULT_MUSIC, THUMB_DIR, THUMB_MANIFEST, THUMB_WIDTH, VIDEO_DIR, VIDEO_EXTENSIONS
+from .ffmpeg import probe_duration, run_ffmpeg
+
+
+def video_dir_signature():
+    """기본 영상 폴더 상태 (파일 이름/수정 시각/크기). 바뀌면 목록을 다시 만듦"""
+    if not os.path.isdir(VIDEO_DIR):
+        return ()
+    signature = []
+    with os.scandir(VIDEO_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                stat = entry.stat()
+                signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
+
+
+def _build_thumbnail(video_path, thumb_path):
+    """캡처 시점으로 바로 탐색해 작은 썸네일 한 장만 추출"""
+    duration = probe_duration(video_path)
+    capture_time = min(1.0, duration / 2) if duration else 0
+    tmp_path = f"{thumb_path}.{uuid.uuid4().hex}.tmp.jpg"
+    try:
+        run_ffmpeg(
+            [
+                "-ss", f"{capture_time:.3f}",
+                "-i", video_path,
+                "-frames:v", "1",
+                "-vf", f"scale={THUMB_WIDTH}:-2",
+                "-q:v", "4",
+                tmp_path,
+            ]
+        )
+        os.replace(tmp_path, thumb_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return thumb_path
+
+
+def build_default_videos(signature=None):
+    """기본 영상 목록을 생성하고 썸네일을 준비 (원본이 바뀐 썸네일만 병렬로 다시 생성)"""
+    if signature is None:
+        signature = video_dir_signature()
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    try:
+        with open(THUMB_MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    default_videos = []
+    pending = {}
+    for filename, mtime_ns, size in signature:
+        video_path = os.path.join(VIDEO_DIR, filename)
+        thumb_path = os.path.join(THUMB_DIR, f"{os.path.splitext(filename)[0]}.jpg")
+        entry = {"mtime_ns": mtime_ns, "size": size, "width": THUMB_WIDTH, "thumbnail": thumb_path}
+        if manifest.get(filename) != entry or not os.path.exists(thumb_path):
+            pending[filename] = (video_path, thumb_path, entry)
+        default_videos.append(
+            {
+                "label": filename,
+                "video_path": video_path,
+                "thumbnail": thumb_path,
+            }
+        )
+
+    if pending:
+        # 실제 작업은 ffmpeg 하위 프로세스에서 돌아가므로 스레드로 동시에 실행
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+            futures = {
+                filename: executor.submit(_build_thumbnail, video_path, thumb_path)
+                for filename, (video_path, thumb_path, _) in pending.items()
+            }
+        failed = set()
+        for filename, future in futures.items():
+            if future.exception() is None:
+                manifest[filename] = pending[filename][2]
+            else:
+                failed.add(filename)
+                manifest.pop(filename, None)
+        default_videos = [video for video in default_videos if video["label"] not in failed]
+
+        known = {filename for filename, _, _ in signature}
+        manifest = {filename: entry for filename, entry in manifest.items() if filename in known}
+        tmp_manifest = f"{THUMB_MANIFEST}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_manifest, THUMB_MANIFEST)
+
+    return default_videos
+
+
+def discover_fonts():
+    """AVAILABLE_FONTS 중 실제로 파일이 있는 폰트 (하나도 없으면 전체)"""
+    fonts = {name: path for name, path in AVAILABLE_FONTS.items() if os.path.isfile(path)}
+    return fonts or dict(AVAILABLE_FONTS)
+
+
+def default_music_path():
+    """기본 배경음악 경로 (파일이 없으면 None)"""
+    return DEFAULT_MUSIC if os.path.exists(DEFAULT_MUSIC) else None
@@ -0,0 +1,114 @@
+"""배경음악: 한 번 디코딩한 PCM을 보관하고 길이/볼륨은 NumPy로 맞춤"""
+
+import hashlib
+import os
+import struct
+import uuid
+
+import numpy as np
+
+from .caching import shared_cache
+from .config import AUDIO_CODEC, AUDIO_SAMPLE_RATE, SEGMENT_CACHE_MAX_BYTES, SEGMENT_DIR
+from .ffmpeg import prune_directory, run_ffmpeg
+from .render_cache import file_digest
+
+
+def _wav_layout(wav):
+    """WAV 바이트의 (채널 수, PCM 시작 위치)
+
+    RIFF 청크 헤더(4바이트 ID + 리틀 엔디언 크기)를 차례로 따라가며 fmt/data 청크를 찾는다.
+    곡 제목 등 태그(LIST 청크)에 "data"라는 글자가 있어도 헷갈리지 않는다.
+    파이프 출력이라 data 청크의 크기 값은 비어 있으므로 data 이후는 끝까지 PCM으로 본다.
+    """
+    channels = None
+    offset = 12
+    while offset + 8 <= len(wav):
+        chunk_id = wav[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", wav, offset + 4)[0]
+        if chunk_id == b"fmt ":
+            channels = struct.unpack_from("<H", wav, offset + 10)[0]
+        elif chunk_id == b"data":
+            if not channels:
+                break
+            return channels, offset + 8
+        # 청크는 짝수 바이트 단위로 정렬됨
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError("음악을 디코딩하지 못했습니다 (WAV data 청크 없음)")
+
+
+def decoded_music(music_path):
+    """음악 파일을 int16 PCM (샘플 수, 채널) 배열로 디코딩 (내용이 같은 파일이면 다시 디코딩하지 않음)
+
+    채널 수는 원본을 그대로 유지한다 (모노 곡을 스테레오로 늘리면 AAC 인코딩만 두 배가 됨).
+    """
+
+    def decode():
+        result = run_ffmpeg(
+            [
+                "-i", music_path,
+                "-vn",
+                "-map_metadata", "-1",
+                "-f", "wav",
+                "-acodec", "pcm_s16le",
+                "-ar", str(AUDIO_SAMPLE_RATE),
+                "pipe:1",
+            ]
+        )
+        wav = result.stdout
+        channels, data_start = _wav_layout(wav)
+        pcm = wav[data_start:len(wav) - (len(wav) - data_start) % (2 * channels)]
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+        samples.flags.writeable = False
+        return samples
+
+    return shared_cache("decoded_music", 4).get_or_create(file_digest(music_path) or music_path, decode)
+
+
+def music_track(music_path, duration, volume=1.0):
+    """duration초에 맞게 반복/자르고 볼륨을 적용한 int16 PCM 배열"""
+    samples = decoded_music(music_path)
+    sample_count = int(round(duration * AUDIO_SAMPLE_RATE))
+    if len(samples) == 0:
+        return np.zeros((sample_count, samples.shape[1]), dtype=np.int16)
+
+    # 짧은 곡은 처음부터 다시 이어 붙임
+    repeats = -(-sample_count // len(samples))
+    track = np.tile(samples, (repeats, 1))[:sample_count] if repeats > 1 else samples[:sample_count]
+    if volume == 1.0:
+        return np.ascontiguousarray(track)
+    scaled = track.astype(np.float32)
+    scaled *= volume
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return scaled.astype(np.int16)
+
+
+def encode_music_track(music_path, duration, volume=1.0):
+    """길이/볼륨을 맞춘 배경음악을 AAC로 인코딩한 파일 경로 (같은 곡/길이/볼륨이면 캐시 재사용)"""
+    key = f"{file_digest(music_path) or os.path.abspath(music_path)}|{duration}|{volume}|{AUDIO_SAMPLE_RATE}|{AUDIO_CODEC}"
+    track_path = os.path.join(SEGMENT_DIR, f"audio-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}.m4a")
+    if os.path.exists(track_path):
+        os.utime(track_path)
+        return track_path
+
+    track = music_track(music_path, duration, volume)
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+    tmp_path = f"{track_path}.{uuid.uuid4().hex}.tmp.m4a"
+    try:
+        run_ffmpeg(
+            [
+                "-f", "s16le",
+                "-ar", str(AUDIO_SAMPLE_RATE),
+                "-ac", str(track.shape[1]),
+                "-i", "pipe:0",
+                "-c:a", AUDIO_CODEC,
+                tmp_path,
+            ],
+            input_bytes=track.tobytes(),
+        )
+        os.replace(tmp_path, track_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    prune_directory(SEGMENT_DIR, SEGMENT_CACHE_MAX_BYTES)
+    return track_path
@@ -0,0 +1,254 @@
+"""배경 준비: 렌더용 영상 사본 캐시, 배경 프레임 저장소, 이미지 배경 전처리"""
+
+import errno
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+from .caching import shared_cache
+from .config import NORMALIZED_DIR, TEMP_DIR, VIDEO_FPS, VIDEO_HEIGHT, VIDEO_WIDTH
+from .ffmpeg import ffmpeg_binary
+
+# Pillow 10 compatibility (MoviePy resize)
+if not hasattr(Image, "ANTIALIAS"):
+    Image.ANTIALIAS = Image.Resampling.LANCZOS
+
+
+def normalized_video_path(video_path, size=(VIDEO_WIDTH, VIDEO_HEIGHT), fps=VIDEO_FPS):
+    """원본 경로/수정 시각/목표 규격으로 정해지는 렌더용 사본 경로"""
+    source_path = os.path.abspath(video_path)
+    stat = os.stat(source_path)
+    source_key = hashlib.sha1(source_path.encode("utf-8")).hexdigest()[:8]
+    version_key = hashlib.sha1(f"{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}@{fps}".encode("utf-8")).hexdigest()[:8]
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(NORMALIZED_DIR, f"{stem}-{source_key}-{version_key}.mp4")
+
+
+def ensure_normalized_video(video_path, size=(VIDEO_WIDTH, VIDEO_HEIGHT), fps=VIDEO_FPS):
+    """배경 영상을 규격(기본 1080x1920, 24fps)에 맞춘 사본을 캐시하고 경로 반환 (원본이 바뀌면 다시 생성)"""
+    cache_path = normalized_video_path(video_path, size, fps)
+    if os.path.exists(cache_path):
+        return cache_path
+
+    os.makedirs(NORMALIZED_DIR, exist_ok=True)
+    width, height = size
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp.mp4"
+    command = [
+        ffmpeg_binary(),
+        "-y",
+        "-loglevel", "error",
+        "-i", video_path,
+        "-an",
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase:flags=lanczos,crop={width}:{height},fps={fps}",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-crf", "18",
+        # 키프레임 간격을 짧게 해서 구간 탐색을 가볍게
+        "-g", str(max(1, fps // 2)),
+        "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart",
+        tmp_path,
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # 같은 원본의 이전 버전 사본 정리 (다른 프로세스가 만들고 있는 .tmp. 파일은 건드리지 않음)
+    stale_prefix = os.path.basename(cache_path).rsplit("-", 1)[0] + "-"
+    for filename in os.listdir(NORMALIZED_DIR):
+        stale_path = os.path.join(NORMALIZED_DIR, filename)
+        if (
+            filename.startswith(stale_prefix)
+            and filename.endswith(".mp4")
+            and ".tmp." not in filename
+            and stale_path != cache_path
+        ):
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return cache_path
+
+
+def _load_video_background(video_path):
+    """영상 배경을 리사이즈/크롭해서 반환"""
+    try:
+        video_path = ensure_normalized_video(video_path)
+    except (OSError, subprocess.CalledProcessError):
+        # 캐시를 만들 수 없으면 원본을 그대로 변환
+        pass
+
+    from moviepy.video.fx.crop import crop
+    from moviepy.video.fx.resize import resize
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+
+    clip = VideoFileClip(video_path)
+    if tuple(clip.size) == (VIDEO_WIDTH, VIDEO_HEIGHT):
+        return clip
+    try:
+        resized = clip.fx(resize, height=VIDEO_HEIGHT)
+        if resized.w < VIDEO_WIDTH:
+            resized = resized.fx(resize, width=VIDEO_WIDTH)
+        cropped = resized.fx(crop, x_center=resized.w / 2, y_center=resized.h / 2, width=VIDEO_WIDTH, height=VIDEO_HEIGHT)
+    except BaseException:
+        # 변환 중 실패해도 ffmpeg 읽기 프로세스를 남기지 않음
+        clip.close()
+        raise
+    return cropped
+
+
+def _ensure_shared_memory_room(nbytes):
+    """공유 메모리(/dev/shm)에 nbytes를 복사할 자리가 없으면 OSError(ENOSPC)
+
+    SharedMemory는 크기만 잡아 두고 페이지는 쓸 때 할당하므로, 자리가 모자라면 만들 때가 아니라
+    복사하는 도중에 SIGBUS로 프로세스가 죽는다. 컨테이너의 /dev/shm은 기본 64MB라 미리 확인한다.
+    """
+    if not os.path.isdir("/dev/shm"):
+        return
+    free = shutil.disk_usage("/dev/shm").free
+    # 동시에 도는 다른 렌더링/진행률 칸이 쓸 몫으로 10% 여유를 둠
+    if free < nbytes * 1.1:
+        raise OSError(errno.ENOSPC, f"공유 메모리 공간 부족 (필요 {nbytes // (1024 * 1024)}MB, 남은 {free // (1024 * 1024)}MB)")
+
+
+class BackgroundFrameStore:
+    """한 번 디코딩/정규화한 배경 프레임을 보관하고 구간마다 재사용"""
+
+    def __init__(self, frames, fps=VIDEO_FPS):
+        self.frames = frames
+        self.fps = fps
+
+    @classmethod
+    def from_video(cls, video_path, duration, fps=VIDEO_FPS, darkness=0):
+        """영상 앞부분(최대 duration초)만 한 번 디코딩해 VIDEO_WIDTH x VIDEO_HEIGHT uint8 프레임으로 저장"""
+        clip = _load_video_background(video_path)
+        try:
+            span = min(duration, clip.duration) if clip.duration else duration
+            frame_count = max(1, int(round(span * fps)))
+            # 프레임이 많아도 메모리를 점유하지 않도록 임시 파일에 매핑
+            os.makedirs(TEMP_DIR, exist_ok=True)
+            frames = np.memmap(
+                tempfile.TemporaryFile(dir=TEMP_DIR),
+                dtype=np.uint8,
+                mode="w+",
+                shape=(frame_count, VIDEO_HEIGHT, VIDEO_WIDTH, 3),
+            )
+            for i in range(frame_count):
+                frame = clip.get_frame(i / fps)[:, :, :3]
+                if darkness > 0:
+                    # 검은 레이어(알파=darkness)를 alpha_composite 한 것과 같은 값
+                    frame = (frame.astype(np.uint16) * (255 - int(darkness)) + 127) // 255
+                frames[i] = frame
+        finally:
+            clip.close()
+        return cls(frames, fps)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get_frame(self, t):
+        """t초의 프레임 (저장된 구간을 넘어가면 반복)"""
+        index = int(t * self.fps + 1e-6) % len(self.frames)
+        return self.frames[index]
+
+    def share(self):
+        """프레임을 공유 메모리로 복사해 (SharedMemory, 다른 프로세스에 넘길 설명) 반환
+
+        다른 프로세스는 attach_shared()로 복사 없이 같은 프레임을 읽는다. 다 쓰면 호출한 쪽에서 close()/unlink() 한다.
+        """
+        from multiprocessing import shared_memory
+
+        _ensure_shared_memory_room(self.frames.nbytes)
+        memory = shared_memory.SharedMemory(create=True, size=self.frames.nbytes)
+        np.ndarray(self.frames.shape, dtype=np.uint8, buffer=memory.buf)[:] = self.frames
+        return memory, (memory.name, tuple(self.frames.shape), self.fps)
+
+    @classmethod
+    @contextmanager
+    def attach_shared(cls, descriptor):
+        """share()로 만든 공유 메모리의 프레임을 복사 없이 쓰는 저장소 (with 블록을 벗어나면 연결 해제)"""
+        from multiprocessing import shared_memory
+
+        name, shape, fps = descriptor
+        memory = shared_memory.SharedMemory(name=name)
+        store = cls(np.ndarray(shape, dtype=np.uint8, buffer=memory.buf), fps)
+        try:
+            yield store
+        finally:
+            store.close()
+            memory.close()
+
+    def make_clip(self, duration):
+        """저장된 프레임을 반복 재생하는 배경 클립"""
+        from moviepy.video.VideoClip import VideoClip
+
+        return VideoClip(make_frame=self.get_frame, duration=duration)
+
+    def close(self):
+        self.frames = None
+
+
+def prepare_video_background(video_path, duration, darkness=0, fps=VIDEO_FPS):
+    """어둡게 처리한 배경 영상 프레임 저장소 (원본/길이/어둡기가 같으면 재사용)"""
+    cache_key = (normalized_video_path(video_path, fps=fps), duration, fps, int(darkness))
+    return shared_cache("video_backgrounds", 2).get_or_create(
+        cache_key,
+        lambda: BackgroundFrameStore.from_video(video_path, duration, fps=fps, darkness=darkness),
+    )
+
+
+def video_preview_frame(video_path, size):
+    """배경 영상 첫 프레임을 size로 맞춘 RGB 이미지 (미리보기용, 원본이 같으면 재사용)"""
+    source_path = os.path.abspath(video_path)
+
+    def build():
+        # 렌더용 사본이 이미 있으면 그쪽이 디코딩이 가벼움
+        normalized_path = normalized_video_path(source_path)
+        input_path = normalized_path if os.path.exists(normalized_path) else source_path
+        width, height = size
+        result = subprocess.run(
+            [
+                ffmpeg_binary(),
+                "-loglevel", "error",
+                "-i", input_path,
+                "-frames:v", "1",
+                "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}",
+                "-f", "rawvideo",
+                "-pix_fmt", "rgb24",
+                "pipe:1",
+            ],
+            check=True,
+            capture_output=True,
+        )
+        return Image.frombytes("RGB", (width, height), result.stdout)
+
+    cache_key = (source_path, os.stat(source_path).st_mtime_ns, tuple(size))
+    return shared_cache("video_preview_frames", 16).get_or_create(cache_key, build)
+
+
+def prepare_image_background(image_path, size=(VIDEO_WIDTH, VIDEO_HEIGHT), darkness=140, blur=0):
+    """업로드 이미지를 크기에 맞추고 어둡게/흐리게 처리한 배경 (원본/어둡기/흐림이 같으면 재사용)"""
+
+    def build():
+        base = Image.open(image_path).convert("RGBA")
+        base = ImageOps.fit(base, size, Image.Resampling.LANCZOS)
+
+        # 어두운 오버레이
+        overlay = Image.new("RGBA", base.size, (0, 0, 0, int(darkness)))
+        base = Image.alpha_composite(base, overlay)
+        if blur > 0:
+            base = base.filter(ImageFilter.GaussianBlur(blur))
+        return base
+
+    cache_key = (os.path.abspath(image_path), os.stat(image_path).st_mtime_ns, tuple(size), int(darkness), blur)
+    return shared_cache("image_backgrounds", 8).get_or_create(cache_key, build)
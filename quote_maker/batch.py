@@ -0,0 +1,281 @@
+"""여러 명언 영상을 CSV/JSONL 작업 파일로 한 번에 렌더링하는 명령행 도구
+
+    python -m quote_maker.batch jobs.csv --output-dir out --workers 8
+
+CSV 열 / JSONL 키:
+    title, lines(CSV는 줄바꿈 또는 "|"로 구분, JSONL은 목록), background_video, background_image,
+    music, music_volume, line_duration, profile(final/draft), backend(segments/ffmpeg), output, 그리고 스타일 값
+    (title_font, body_font, title_size, body_size, title_color, body_color, brand_color,
+    overlay_blur, overlay_darkness, brand_text). JSONL은 style 객체로 묶어도 된다.
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import (
+    AVAILABLE_FONTS,
+    DEFAULT_LINE_DURATION,
+    DEFAULT_MUSIC,
+    DEFAULT_RENDER_BACKEND,
+    DEFAULT_RENDER_PROFILE,
+    FOOTER_BRAND,
+    RENDER_BACKENDS,
+    RENDER_PROFILES,
+)
+from .jobs import RenderJobSpec
+from .metrics import PeakMemoryMonitor, RenderMetrics, record_render_job
+from .render_cache import fetch_cached_render, render_cache_key, store_render
+
+# 화면의 기본값과 같은 스타일
+DEFAULT_STYLE = {
+    "title_font": "Gmarket Sans Bold",
+    "body_font": "Gmarket Sans Medium",
+    "title_size": 140,
+    "body_size": 62,
+    "title_color": "#FFD600",
+    "body_color": "#FFFFFF",
+    "brand_color": "#FF9800",
+    "overlay_blur": 5,
+    "overlay_darkness": 140,
+    "brand_text": FOOTER_BRAND,
+}
+# 정수 스타일 값의 허용 범위 (양 끝 포함)
+_INT_STYLE_RANGES = {
+    "title_size": (1, 500),
+    "body_size": (1, 500),
+    "overlay_blur": (0, 50),
+    "overlay_darkness": (0, 255),
+}
+
+
+def _font_path(value):
+    """폰트 이름(AVAILABLE_FONTS) 또는 파일 경로"""
+    return AVAILABLE_FONTS.get(value, value)
+
+
+def _read_rows(jobs_file):
+    if jobs_file.endswith(".jsonl"):
+        with open(jobs_file, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(jobs_file, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _row_to_spec(index, row, output_dir):
+    """작업 파일 한 행을 RenderJobSpec으로 변환 (빈 칸은 기본값)"""
+    row = {key: value for key, value in row.items() if value not in (None, "")}
+    lines = row.get("lines") or []
+    if isinstance(lines, str):
+        lines = lines.replace("|", "\n").split("\n")
+    lines = tuple(line.strip() for line in lines if line.strip())
+    if not lines:
+        raise ValueError("본문(lines)이 비어 있습니다")
+
+    style = {**DEFAULT_STYLE, **{key: row[key] for key in DEFAULT_STYLE if key in row}, **row.get("style", {})}
+    for key, (low, high) in _INT_STYLE_RANGES.items():
+        style[key] = int(style[key])
+        if not low <= style[key] <= high:
+            raise ValueError(f"{key}는 {low}~{high} 사이여야 합니다: {style[key]}")
+
+    background_video = row.get("background_video")
+    background_image = row.get("background_image")
+    if not background_video and not background_image:
+        raise ValueError("배경(background_video 또는 background_image)이 없습니다")
+
+    profile = row.get("profile", DEFAULT_RENDER_PROFILE)
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"알 수 없는 렌더링 프로필: {profile}")
+    backend = row.get("backend", DEFAULT_RENDER_BACKEND)
+    if backend not in RENDER_BACKENDS:
+        raise ValueError(f"알 수 없는 렌더링 방식: {backend}")
+
+    music = row.get("music", DEFAULT_MUSIC if os.path.exists(DEFAULT_MUSIC) else None)
+    if music == "none":
+        music = None
+
+    return RenderJobSpec(
+        title=row.get("title", ""),
+        lines=lines,
+        style_options={
+            "title_font_path": _font_path(style["title_font"]),
+            "body_font_path": _font_path(style["body_font"]),
+            "brand_font_path": _font_path(style["title_font"]),
+            "title_size": style["title_size"],
+            "body_size": style["body_size"],
+            "overlay_blur": style["overlay_blur"],
+            "overlay_darkness": style["overlay_darkness"],
+            "colors": {
+                "title": style["title_color"],
+                "body": style["body_color"],
+                "brand": style["brand_color"],
+            },
+            "brand_text": style["brand_text"],
+        },
+        output_file=os.path.abspath(os.path.join(output_dir, row.get("output", f"shorts_{index:04d}.mp4"))),
+        bg_video_path=background_video,
+        bg_image_path=background_image,
+        music_path=music,
+        music_volume=float(row.get("music_volume", 0.3)),
+        line_duration=float(row.get("line_duration", DEFAULT_LINE_DURATION)),
+        profile=profile,
+        backend=backend,
+    )
+
+
+def _init_worker():
+    """작업 프로세스마다 한 번: 렌더링 모듈을 읽고 폰트마다 기본 스타일 배치를 한 번 계산해 두어 이후 작업은 캐시를 그대로 씀
+
+    배치 계산이 쓰는 실제 크기(인트로 제목, 브랜드 등)의 폰트와 글자 폭 캐시가 함께 채워진다.
+    """
+    from .text import build_scene_layout
+
+    importlib.import_module(".render", __package__)
+
+    for path in set(AVAILABLE_FONTS.values()):
+        if os.path.exists(path):
+            build_scene_layout(
+                "명언 메이커",
+                ["오늘의 한 줄"],
+                title_font_path=path,
+                body_font_path=path,
+                brand_font_path=path,
+                title_size=DEFAULT_STYLE["title_size"],
+                body_size=DEFAULT_STYLE["body_size"],
+                brand_text=DEFAULT_STYLE["brand_text"],
+            )
+
+
+def _render_one(index, spec):
+    """작업 하나를 렌더링하고 결과 기록(dict) 반환"""
+    from .render import render_video
+
+    started = time.perf_counter()
+    record = {"index": index, "title": spec.title, "output": spec.output_file, "cached": False, "peak_rss_mb": None}
+    try:
+        os.makedirs(os.path.dirname(spec.output_file), exist_ok=True)
+        cache_key = render_cache_key(spec)
+        if fetch_cached_render(cache_key, spec.output_file):
+            record["cached"] = True
+        else:
+            monitor = PeakMemoryMonitor()
+            metrics = RenderMetrics()
+            try:
+                with monitor:
+                    render_video(
+                        spec.title,
+                        list(spec.lines),
+                        spec.style_options,
+                        spec.output_file,
+                        bg_video_path=spec.bg_video_path,
+                        bg_image_path=spec.bg_image_path,
+                        music_path=spec.music_path,
+                        music_volume=spec.music_volume,
+                        line_duration=spec.line_duration,
+                        profile=spec.profile,
+                        backend=spec.backend,
+                        # 작업 프로세스끼리 이미 CPU를 나눠 쓰므로 구간 인코딩 풀을 따로 띄우지 않고 순서대로 인코딩
+                        segment_workers=1,
+                        metrics=metrics,
+                    )
+            finally:
+                record["peak_rss_mb"] = monitor.peak_mb
+                record.update(metrics.as_dict())
+            store_render(cache_key, spec.output_file)
+        record["status"] = "done"
+    except Exception as e:
+        record.update(status="failed", error=str(e))
+        if os.path.exists(spec.output_file):
+            # 실패한 작업이 쓰다 만 영상은 남기지 않음
+            os.remove(spec.output_file)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    record_render_job(
+        {
+            "job_id": f"batch-{index}",
+            "status": record["status"],
+            "cached": record["cached"],
+            "backend": spec.backend,
+            "profile": spec.profile,
+            "lines": len(spec.lines),
+            "line_duration": spec.line_duration,
+            "wall_s": record["seconds"],
+            "peak_rss_mb": record["peak_rss_mb"],
+            "error": record.get("error"),
+            "stages": record.get("stages", {}),
+            "frames_encoded": record.get("frames_encoded", 0),
+            "encode_fps": record.get("encode_fps"),
+        }
+    )
+    return record
+
+
+def _prepare_backgrounds(specs):
+    """배경 영상 정규화 사본을 작업 전에 한 번씩만 만들어 작업 프로세스끼리 중복 변환하지 않게 함"""
+    from .background import ensure_normalized_video
+
+    for video_path in sorted({spec.bg_video_path for spec in specs if spec.bg_video_path}):
+        try:
+            ensure_normalized_video(video_path)
+        except (OSError, subprocess.CalledProcessError):
+            # 렌더링 중 원본 변환으로 대체됨
+            pass
+
+
+def run_batch(jobs_file, output_dir, workers=None, manifest_path=None):
+    """작업 파일을 모두 렌더링하고 결과 manifest(dict) 반환"""
+    workers = workers or os.cpu_count() or 1
+    manifest_path = manifest_path or os.path.join(output_dir, "manifest.json")
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+
+    records = []
+    specs = {}
+    for index, row in enumerate(_read_rows(jobs_file)):
+        try:
+            specs[index] = _row_to_spec(index, row, output_dir)
+        except (KeyError, ValueError) as e:
+            records.append({"index": index, "title": row.get("title", ""), "status": "failed", "error": str(e), "seconds": 0})
+
+    _prepare_backgrounds(specs.values())
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_render_one, index, spec) for index, spec in specs.items()]
+        for finished, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            records.append(record)
+            print(f"[{finished}/{len(futures)}] {record['status']} {record['seconds']:.1f}s {record.get('output', '')}", flush=True)
+
+    records.sort(key=lambda record: record["index"])
+    manifest = {
+        "jobs_file": os.path.abspath(jobs_file),
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "done": sum(1 for record in records if record["status"] == "done"),
+        "failed": sum(1 for record in records if record["status"] == "failed"),
+        "jobs": records,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV/JSONL 작업 파일로 명언 영상을 일괄 렌더링")
+    parser.add_argument("jobs_file", help="작업 목록 (.csv 또는 .jsonl)")
+    parser.add_argument("--output-dir", default="batch_output", help="결과 영상 폴더 (기본: batch_output)")
+    parser.add_argument("--workers", type=int, default=None, help="동시에 렌더링할 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--manifest", default=None, help="결과 manifest 경로 (기본: <output-dir>/manifest.json)")
+    args = parser.parse_args(argv)
+
+    manifest = run_batch(args.jobs_file, args.output_dir, args.workers, args.manifest)
+    print(f"완료 {manifest['done']}개, 실패 {manifest['failed']}개, {manifest['total_seconds']:.1f}초")
+    return 1 if manifest["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,539 @@
+"""오프라인 성능 벤치마크: 줄바꿈/배치, 텍스트 레이어, 합성, 배경 영상, 인코딩, 전체 렌더링
+
+    python -m quote_maker.bench run --output bench.json            # 측정 후 JSON 저장
+    python -m quote_maker.bench run --quick --only wrap_title,composite
+    python -m quote_maker.bench compare baseline.json bench.json   # 기준 대비 비교 (느려지면 종료 코드 1)
+
+배경 영상(ffmpeg testsrc2)/이미지/무음 오디오는 임시 폴더에 직접 만들고, 폰트는 fonts/ 폴더의 것을 쓰므로
+네트워크나 사용자 파일 없이 같은 조건으로 반복 측정할 수 있다. 결과는 케이스마다 초당 실행 수, 지연(ms),
+프레임당 지연, 메모리(tracemalloc 최대 할당량, 프로세스 트리 최대 RSS)를 담는다.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+from PIL import Image
+
+from .caching import clear_shared_caches
+from .config import FONT_BOLD, FONT_DIR, FONT_MEDIUM, SEGMENT_WORKERS, TEMP_DIR, VIDEO_FPS, VIDEO_HEIGHT, VIDEO_WIDTH
+from .ffmpeg import ffmpeg_binary
+from .metrics import PeakMemoryMonitor
+
+# 결과 JSON 형식이 바뀌면 올림 (compare는 같은 형식끼리만 비교)
+BENCH_SCHEMA = 1
+BENCH_LINE_DURATION = 2.5
+
+_KOREAN_WORDS = (
+    "오늘", "작은", "습관이", "내일의", "나를", "만든다", "포기하지", "않는", "마음이", "가장", "큰",
+    "재능이다", "천천히", "가도", "멈추지만", "않으면", "된다", "실패는", "성공으로", "가는", "과정이다",
+)
+_LATIN_WORDS = (
+    "small", "habits", "build", "the", "person", "you", "become", "tomorrow", "never", "give", "up",
+    "patience", "is", "the", "greatest", "talent", "keep", "moving", "forward", "every", "single", "day",
+)
+
+
+def _latin_font(fallback):
+    path = os.path.join(FONT_DIR, "PlayfairDisplay-Regular.ttf")
+    return path if os.path.exists(path) else fallback
+
+
+def _sample_text(lang, length, seed):
+    """lang("ko"/"latin") 단어로 만든 length글자 안팎의 문장 (seed가 같으면 항상 같은 문장)"""
+    words = _KOREAN_WORDS if lang == "ko" else _LATIN_WORDS
+    rng = random.Random(f"{lang}-{length}-{seed}")
+    text = ""
+    while len(text) < length:
+        text = f"{text} {rng.choice(words)}".strip()
+    return text[:length].rstrip()
+
+
+def _style(lang, title_size=140, body_size=62, blur=5, darkness=140):
+    """앱 기본값과 같은 스타일 (라틴 문자는 fonts/의 라틴 폰트로)"""
+    title_font = FONT_BOLD if lang == "ko" else _latin_font(FONT_BOLD)
+    body_font = FONT_MEDIUM if lang == "ko" else _latin_font(FONT_MEDIUM)
+    return {
+        "title_font_path": title_font,
+        "body_font_path": body_font,
+        "brand_font_path": title_font,
+        "title_size": title_size,
+        "body_size": body_size,
+        "overlay_blur": blur,
+        "overlay_darkness": darkness,
+        "colors": {"title": "#FFD600", "body": "#FFFFFF", "brand": "#FF9800"},
+        "brand_text": "명언 메이커",
+    }
+
+
+def _text_options(style):
+    """create_text_overlay/create_text_image에 넘길 글자 관련 값만"""
+    return {key: value for key, value in style.items() if key not in ("overlay_blur", "overlay_darkness")}
+
+
+def make_fixtures(directory, video_seconds=3.0):
+    """벤치마크 입력 파일을 directory에 만들어 {"video", "image", "audio"} 경로 반환
+
+    영상은 규격과 다른 크기(720x1280, 30fps)로 만들어 크기 조정/프레임 변환 경로까지 측정한다.
+    """
+    video_path = os.path.join(directory, "background.mp4")
+    subprocess.run(
+        [
+            ffmpeg_binary(), "-y", "-loglevel", "error",
+            "-f", "lavfi",
+            "-i", f"testsrc2=size=720x1280:rate=30:duration={video_seconds}",
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-pix_fmt", "yuv420p",
+            video_path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    # 흐림 처리 비용이 실제 사진과 비슷하도록 그라데이션 위에 고정 시드 잡음을 섞음
+    rng = np.random.default_rng(0)
+    height, width = 1800, 1200
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None] * np.array([0.9, 0.5, 0.3], dtype=np.float32)
+    pixels = np.broadcast_to(gradient, (height, width, 3)) + rng.normal(0, 24, (height, width, 3))
+    image_path = os.path.join(directory, "background.jpg")
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(image_path, quality=90)
+
+    audio_path = os.path.join(directory, "silence.wav")
+    with wave.open(audio_path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(44100)
+        f.writeframes(b"\0" * 4 * 44100 * 5)
+    return {"video": video_path, "image": image_path, "audio": audio_path}
+
+
+def _sweep(**axes):
+    """축별 값 목록의 모든 조합을 dict로"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+# 케이스 정의: make(params, fixtures) -> (실행 함수, 매번 실행 전 준비 함수 또는 None, 한 번에 처리하는 프레임 수 또는 None)
+
+
+def _make_wrap_title(params, fixtures):
+    from .text import _wrap_title, load_font
+
+    font = load_font(_style(params["lang"])["title_font_path"], params["size"], None)
+    title = _sample_text(params["lang"], params["length"], "title")
+    setup = (lambda: clear_shared_caches("text_measurers")) if params["cache"] == "cold" else None
+    return (lambda: _wrap_title(title, font, int(VIDEO_WIDTH * 0.85))), setup, None
+
+
+def _make_wrap_body(params, fixtures):
+    from .text import _wrap_body_line, load_font
+
+    font = load_font(_style(params["lang"])["body_font_path"], params["size"], None)
+    lines = [_sample_text(params["lang"], params["length"], i) for i in range(5)]
+    max_width = VIDEO_WIDTH - 200
+
+    def run():
+        for line in lines:
+            _wrap_body_line(line, font, max_width)
+
+    setup = (lambda: clear_shared_caches("text_measurers")) if params["cache"] == "cold" else None
+    return run, setup, None
+
+
+def _make_scene_layout(params, fixtures):
+    from .text import build_scene_layout
+
+    style = _text_options(_style(params["lang"], body_size=params["size"]))
+    title = _sample_text(params["lang"], 16, "title")
+    lines = [_sample_text(params["lang"], 30, i) for i in range(params["lines"])]
+    return (lambda: build_scene_layout(title, lines, **style)), None, None
+
+
+def _make_text_overlay(params, fixtures):
+    from .text import create_text_overlay
+
+    style = _style(params["lang"])
+    title = _sample_text(params["lang"], 16, "title")
+    lines = [_sample_text(params["lang"], 30, i) for i in range(params["lines"])]
+    options = {**_text_options(style), "overlay_darkness": 0, "overlay_blur": 0}
+    setup = (lambda: clear_shared_caches("scene_renderers", "text_measurers")) if params["cache"] == "cold" else None
+    return (lambda: create_text_overlay(title, lines, 0, **options)), setup, None
+
+
+def _make_text_image(params, fixtures):
+    from .text import create_text_image
+
+    style = _style("ko", blur=params["blur"])
+    title = _sample_text("ko", 16, "title")
+    lines = [_sample_text("ko", 30, i) for i in range(3)]
+    options = {**_text_options(style), "overlay_darkness": style["overlay_darkness"], "overlay_blur": style["overlay_blur"]}
+    setup = (lambda: clear_shared_caches("image_backgrounds", "scene_renderers")) if params["cache"] == "cold" else None
+    return (lambda: create_text_image(fixtures["image"], title, lines, 0, **options)), setup, None
+
+
+def _make_composite(params, fixtures):
+    from .text import create_text_overlay
+    from .video import OverlayCompositor
+
+    style = _style("ko")
+    lines = [_sample_text("ko", 30, i) for i in range(params["lines"])]
+    overlay = create_text_overlay(
+        _sample_text("ko", 16, "title"), lines, 0, **{**_text_options(style), "overlay_darkness": 0, "overlay_blur": 0}
+    )
+    compositor = OverlayCompositor(overlay)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (VIDEO_HEIGHT, VIDEO_WIDTH, 3), dtype=np.uint8) for _ in range(4)]
+    counter = itertools.count()
+    return (lambda: compositor.composite(frames[next(counter) % len(frames)])), None, 1
+
+
+def _make_normalize_video(params, fixtures):
+    from .background import ensure_normalized_video, normalized_video_path
+
+    def setup():
+        # 매번 정규화 사본이 없는 상태에서 측정
+        path = normalized_video_path(fixtures["video"])
+        if os.path.exists(path):
+            os.remove(path)
+
+    return (lambda: ensure_normalized_video(fixtures["video"])), setup, None
+
+
+def _make_background_frames(params, fixtures):
+    from .background import BackgroundFrameStore, ensure_normalized_video
+
+    # 정규화 사본은 미리 만들어 두고, 디코딩/어둡게 처리/프레임 저장만 측정 (_load_video_background 포함)
+    ensure_normalized_video(fixtures["video"])
+    frame_count = max(1, int(round(BENCH_LINE_DURATION * VIDEO_FPS)))
+    return (
+        lambda: BackgroundFrameStore.from_video(fixtures["video"], BENCH_LINE_DURATION, darkness=params["darkness"])
+    ), None, frame_count
+
+
+def _make_encode_segment(params, fixtures):
+    from .background import prepare_video_background
+    from .text import create_text_overlay
+    from .video import OverlayCompositor, _encode_overlay_frames
+
+    style = _style("ko")
+    overlay = create_text_overlay(
+        _sample_text("ko", 16, "title"),
+        [_sample_text("ko", 30, i) for i in range(3)],
+        0,
+        **{**_text_options(style), "overlay_darkness": 0, "overlay_blur": 0},
+    )
+    compositor = OverlayCompositor(overlay)
+    store = prepare_video_background(fixtures["video"], BENCH_LINE_DURATION, darkness=140)
+    output_path = os.path.join(fixtures["dir"], f"segment-{params['profile']}.mp4")
+
+    def run():
+        _encode_overlay_frames(compositor, store, output_path, BENCH_LINE_DURATION, VIDEO_FPS, params["profile"])
+
+    return run, None, max(1, int(round(BENCH_LINE_DURATION * VIDEO_FPS)))
+
+
+def _make_encode_segments(params, fixtures):
+    from .background import prepare_video_background
+    from .text import create_text_overlay
+    from .video import encode_overlay_segments
+
+    # 화면이 서로 다른 구간 여러 개: workers가 2 이상이면 공유 메모리 + 구간 인코딩 프로세스 풀 경로를 탐
+    style = _style("ko")
+    overlays = [
+        create_text_overlay(
+            _sample_text("ko", 16, f"title-{i}"),
+            [_sample_text("ko", 30, f"{i}-{j}") for j in range(3)],
+            0,
+            **{**_text_options(style), "overlay_darkness": 0, "overlay_blur": 0},
+        )
+        for i in range(params["segments"])
+    ]
+    store = prepare_video_background(fixtures["video"], BENCH_LINE_DURATION, darkness=140)
+    counter = itertools.count()
+
+    def run():
+        # 배경 키를 매번(케이스마다) 바꿔 구간 캐시 없이 모두 새로 인코딩
+        encode_overlay_segments(
+            overlays,
+            f"bench-workers{params['workers']}-{next(counter)}",
+            lambda: store,
+            BENCH_LINE_DURATION,
+            profile="draft",
+            workers=params["workers"],
+        )
+
+    return run, None, params["segments"] * max(1, int(round(BENCH_LINE_DURATION * VIDEO_FPS)))
+
+
+def _make_render(params, fixtures):
+    from .render import render_video
+
+    style = _style("ko")
+    lines = [_sample_text("ko", 30, i) for i in range(params["lines"])]
+    output_path = os.path.join(fixtures["dir"], f"render-{params['backend']}-{params['background']}.mp4")
+    counter = itertools.count()
+    background = {"bg_video_path": fixtures["video"]} if params["background"] == "video" else {"bg_image_path": fixtures["image"]}
+
+    def run():
+        # 제목을 매번 바꿔 구간 캐시 없이 전체를 다시 인코딩
+        render_video(
+            f"벤치마크 {next(counter)}",
+            lines,
+            style,
+            output_path,
+            music_path=fixtures["audio"],
+            line_duration=BENCH_LINE_DURATION,
+            profile=params["profile"],
+            backend=params["backend"],
+            **background,
+        )
+
+    return run, None, params["lines"] * max(1, int(round(BENCH_LINE_DURATION * VIDEO_FPS)))
+
+
+# (이름, 스윕, 케이스 생성 함수, 무거운 케이스 여부: 반복 횟수를 줄임)
+BENCHMARKS = (
+    ("wrap_title", _sweep(lang=("ko", "latin"), length=(12, 48), size=(120, 160), cache=("warm", "cold")), _make_wrap_title, False),
+    ("wrap_body", _sweep(lang=("ko", "latin"), length=(20, 80), size=(48, 62, 80), cache=("warm", "cold")), _make_wrap_body, False),
+    ("scene_layout", _sweep(lang=("ko", "latin"), lines=(1, 3, 6, 10), size=(48, 80)), _make_scene_layout, False),
+    ("text_overlay", _sweep(lang=("ko", "latin"), lines=(3, 10), cache=("warm", "cold")), _make_text_overlay, False),
+    ("text_image", _sweep(blur=(0, 5, 15), cache=("warm", "cold")), _make_text_image, False),
+    ("composite", _sweep(lines=(1, 3, 10)), _make_composite, False),
+    ("normalize_video", _sweep(), _make_normalize_video, True),
+    ("background_frames", _sweep(darkness=(0, 140)), _make_background_frames, True),
+    ("encode_segment", _sweep(profile=("draft", "final")), _make_encode_segment, True),
+    ("encode_segments", _sweep(segments=(4,), workers=tuple(sorted({1, SEGMENT_WORKERS}))), _make_encode_segments, True),
+    (
+        "render",
+        _sweep(backend=("segments", "ffmpeg"), background=("video", "image"), lines=(3,), profile=("draft",)),
+        _make_render,
+        True,
+    ),
+)
+
+
+def _case_id(name, params):
+    return name + ("[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]" if params else "")
+
+
+def _measure(run, setup, min_time, max_ops):
+    """준비 실행 한 번 뒤 min_time초 또는 max_ops번까지 반복해 각 실행 시간(초) 목록과 최대 RSS(MB) 반환"""
+    if setup:
+        setup()
+    run()
+    times = []
+    with PeakMemoryMonitor() as monitor:
+        deadline = time.perf_counter() + min_time
+        min_ops = min(3, max_ops)
+        while len(times) < max_ops and (len(times) < min_ops or time.perf_counter() < deadline):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+    return times, monitor.peak_mb
+
+
+def _traced_peak_mb(run, setup):
+    """한 번 실행하는 동안 Python/NumPy가 새로 할당한 메모리의 최댓값(MB)"""
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 3)
+
+
+def _summary(name, params, times, frames, peak_alloc_mb, peak_rss_mb):
+    total = sum(times)
+    ordered = sorted(times)
+    result = {
+        "id": _case_id(name, params),
+        "name": name,
+        "params": params,
+        "ops": len(times),
+        "ops_per_sec": round(len(times) / total, 3) if total else None,
+        "mean_ms": round(1000 * statistics.fmean(times), 4),
+        "p50_ms": round(1000 * statistics.median(times), 4),
+        "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 4),
+        "min_ms": round(1000 * ordered[0], 4),
+        "peak_alloc_mb": peak_alloc_mb,
+        "peak_rss_mb": peak_rss_mb,
+    }
+    if frames:
+        result["frames_per_op"] = frames
+        result["per_frame_ms"] = round(result["p50_ms"] / frames, 4)
+        result["frames_per_sec"] = round(1000 / result["per_frame_ms"], 2) if result["per_frame_ms"] else None
+    return result
+
+
+def _environment():
+    try:
+        ffmpeg_version = subprocess.run(
+            [ffmpeg_binary(), "-version"], check=True, capture_output=True, text=True
+        ).stdout.splitlines()[0]
+    except (OSError, subprocess.CalledProcessError, IndexError):
+        ffmpeg_version = None
+    import PIL
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "ffmpeg": ffmpeg_version,
+    }
+
+
+@contextlib.contextmanager
+def _isolated_cache_dirs(directory):
+    """측정 중 렌더링이 쓰는 캐시 폴더(구간/오디오, 정규화 사본, 렌더링 결과, 미리보기)를 directory 아래로 돌림
+
+    실제 캐시를 채우거나 정리(prune)하지 않고, 이전 실행의 캐시가 측정에 섞이지도 않게 한다.
+    """
+    from . import audio, background, preview, render_cache, video
+
+    targets = (
+        (video, "SEGMENT_DIR", "segments"),
+        (audio, "SEGMENT_DIR", "segments"),
+        (background, "NORMALIZED_DIR", "normalized"),
+        (render_cache, "RENDER_CACHE_DIR", "renders"),
+        (preview, "PREVIEW_DIR", "previews"),
+    )
+    saved = [(module, name, getattr(module, name)) for module, name, _ in targets]
+    for module, name, subdir in targets:
+        setattr(module, name, os.path.join(directory, subdir))
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+def run_benchmarks(only=None, quick=False, min_time=None, log=print):
+    """벤치마크를 실행하고 결과 dict 반환 (only: 실행할 벤치마크 이름 목록)
+
+    quick이면 스윕마다 첫 조합과 마지막 조합만, 무거운 케이스는 한 번만 잰다.
+    """
+    min_time = min_time if min_time is not None else (0.2 if quick else 1.0)
+    results = []
+    started = time.time()
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="bench-", dir=TEMP_DIR) as directory:
+        fixtures = {**make_fixtures(directory), "dir": directory}
+        with _isolated_cache_dirs(directory):
+            for name, sweep, make, heavy in BENCHMARKS:
+                if only and name not in only:
+                    continue
+                if quick and len(sweep) > 2:
+                    sweep = [sweep[0], sweep[-1]]
+                for params in sweep or [{}]:
+                    run, setup, frames = make(params, fixtures)
+                    max_ops = (1 if quick else 3) if heavy else 10000
+                    times, peak_rss_mb = _measure(run, setup, 0 if heavy else min_time, max_ops)
+                    result = _summary(name, params, times, frames, _traced_peak_mb(run, setup), peak_rss_mb)
+                    results.append(result)
+                    log(f"{result['id']:<70} {result['ops_per_sec']:>10.2f} ops/s  p50 {result['p50_ms']:>10.3f} ms")
+
+    return {
+        "schema": BENCH_SCHEMA,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+        "seconds": round(time.time() - started, 3),
+        "quick": quick,
+        "min_time": min_time,
+        "environment": _environment(),
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.1, metric="p50_ms"):
+    """같은 케이스끼리 metric(작을수록 좋은 값)을 비교한 목록 반환
+
+    각 항목은 {"id", "baseline", "current", "ratio", "verdict"}이며, verdict는 current가 baseline보다
+    threshold 넘게 느리면 "slower", 빠르면 "faster", 그 사이면 "same", 한쪽에만 있으면 "missing"/"new".
+    """
+    if baseline.get("schema") != current.get("schema"):
+        raise ValueError(f"결과 형식이 다릅니다: {baseline.get('schema')} != {current.get('schema')}")
+    before = {result["id"]: result for result in baseline["results"]}
+    after = {result["id"]: result for result in current["results"]}
+    rows = []
+    for case_id in list(before) + [case_id for case_id in after if case_id not in before]:
+        old, new = before.get(case_id), after.get(case_id)
+        if old is None or new is None:
+            rows.append({"id": case_id, "baseline": old and old[metric], "current": new and new[metric], "ratio": None,
+                         "verdict": "new" if old is None else "missing"})
+            continue
+        ratio = new[metric] / old[metric] if old[metric] else None
+        if ratio is None:
+            verdict = "same"
+        elif ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append({"id": case_id, "baseline": old[metric], "current": new[metric],
+                     "ratio": round(ratio, 3) if ratio else None, "verdict": verdict})
+    return rows
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="명언 영상 렌더링 성능 벤치마크 (오프라인)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="벤치마크 실행")
+    run_parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: 화면에만 출력)")
+    run_parser.add_argument("--only", default=None, help="실행할 벤치마크 이름 (쉼표로 구분): " + ", ".join(name for name, *_ in BENCHMARKS))
+    run_parser.add_argument("--quick", action="store_true", help="조합과 반복을 줄여 빠르게 확인")
+    run_parser.add_argument("--min-time", type=float, default=None, help="가벼운 케이스를 반복할 최소 시간(초)")
+
+    compare_parser = commands.add_parser("compare", help="기준 결과와 비교")
+    compare_parser.add_argument("baseline", help="기준 결과 JSON")
+    compare_parser.add_argument("current", help="비교할 결과 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="느려짐으로 판단할 비율 (기본 0.1 = 10%%)")
+    compare_parser.add_argument("--metric", default="p50_ms", choices=("p50_ms", "mean_ms", "min_ms", "p95_ms"), help="비교할 값 (기본 p50_ms)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        only = set(args.only.split(",")) if args.only else None
+        report = run_benchmarks(only=only, quick=args.quick, min_time=args.min_time)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"결과 저장: {args.output} ({len(report['results'])}개 케이스, {report['seconds']:.1f}초)")
+        return 0
+
+    rows = compare_results(_load(args.baseline), _load(args.current), args.threshold, args.metric)
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] else "-"
+        print(f"{row['id']:<70} {row['baseline'] or '-':>12} → {row['current'] or '-':>12} {ratio:>7}  {row['verdict']}")
+    slower = [row for row in rows if row["verdict"] == "slower"]
+    print(f"느려짐 {len(slower)}개, 빨라짐 {sum(1 for row in rows if row['verdict'] == 'faster')}개 (기준 {args.metric}, 허용 {args.threshold:.0%})")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
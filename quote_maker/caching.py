@@ -0,0 +1,53 @@
+"""프로세스 전체에서 공유하는 크기 제한 캐시"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """여러 세션/스레드가 함께 쓰는 크기 제한 LRU 캐시"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        """캐시된 값을 반환하고, 없으면 factory()로 만들어 저장"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        value = factory()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_SHARED_CACHES = {}
+_SHARED_CACHES_LOCK = threading.Lock()
+
+
+def shared_cache(name, maxsize):
+    """이름별로 하나씩 만들어 프로세스 안의 모든 세션/스레드가 함께 쓰는 캐시"""
+    with _SHARED_CACHES_LOCK:
+        cache = _SHARED_CACHES.get(name)
+        if cache is None:
+            cache = _SHARED_CACHES[name] = LRUCache(maxsize)
+        return cache
+
+
+def clear_shared_caches(*names):
+    """이름을 준 공유 캐시(이름이 없으면 전부)를 비움. 벤치마크에서 캐시 없는 상태를 잴 때 사용"""
+    with _SHARED_CACHES_LOCK:
+        caches = [cache for name, cache in _SHARED_CACHES.items() if not names or name in names]
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,74 @@
+"""경로/규격/폰트 등 정적 설정"""
+
+import os
+
+# 경로/폰트 설정 (프로젝트 루트 기준)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FONT_DIR = os.path.join(ROOT_DIR, "fonts")
+FONT_BOLD = os.path.join(FONT_DIR, "GmarketSansTTFBold.ttf")
+FONT_MEDIUM = os.path.join(FONT_DIR, "GmarketSansTTFMedium.ttf")
+FOOTER_BRAND = "명언 메이커"
+VIDEO_WIDTH = 1080
+VIDEO_HEIGHT = 1920
+VIDEO_FPS = 24
+VIDEO_CODEC = "libx264"
+AUDIO_CODEC = "aac"
+AUDIO_SAMPLE_RATE = 44100
+
+# 렌더링 품질 프로필: x264 preset/CRF/스레드 수(0=자동)/픽셀 형식과 출력 해상도 배율
+RENDER_PROFILES = {
+    "final": {"label": "최종 (고화질)", "preset": "medium", "crf": 23, "threads": 0, "pix_fmt": "yuv420p", "scale": 1.0},
+    "draft": {"label": "초안 (빠름, 540x960)", "preset": "ultrafast", "crf": 30, "threads": 0, "pix_fmt": "yuv420p", "scale": 0.5},
+}
+DEFAULT_RENDER_PROFILE = "final"
+# 렌더링 방식: 구간별 NumPy 합성(구간 캐시/병렬 인코딩) 또는 ffmpeg 필터그래프 한 번
+RENDER_BACKENDS = {
+    "segments": "구간 합성 (기본)",
+    "ffmpeg": "ffmpeg 필터그래프",
+}
+DEFAULT_RENDER_BACKEND = "segments"
+# 프레임 합성과 인코딩 사이에 미리 만들어 둘 프레임 수
+ENCODE_QUEUE_FRAMES = 8
+# 한 영상 안에서 서로 다른 구간을 동시에 인코딩할 프로세스 수 (1이면 순서대로 인코딩)
+SEGMENT_WORKERS = int(os.environ.get("QUOTE_MAKER_SEGMENT_WORKERS", str(min(4, os.cpu_count() or 1))))
+DEFAULT_LINE_DURATION = 2.5
+DEFAULT_MUSIC = os.path.join(ROOT_DIR, "music", "just-relax-11157.mp3")
+
+VIDEO_DIR = os.path.join(ROOT_DIR, "video")
+TEMP_DIR = os.path.join(ROOT_DIR, "temp")
+THUMB_DIR = os.path.join(TEMP_DIR, "thumbs")
+THUMB_MANIFEST = os.path.join(THUMB_DIR, "manifest.json")
+THUMB_WIDTH = 360
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm")
+NORMALIZED_DIR = os.path.join(TEMP_DIR, "normalized")
+SEGMENT_DIR = os.path.join(TEMP_DIR, "segments")
+SEGMENT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 완성된 영상 캐시 (같은 입력이면 다시 렌더링하지 않음)
+RENDER_CACHE_DIR = os.path.join(TEMP_DIR, "renders")
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("QUOTE_MAKER_RENDER_CACHE_MB", "1024")) * 1024 * 1024
+
+# 미리보기: 출력 해상도 대비 배율, 업로드 이미지 임시 보관 폴더
+PREVIEW_SCALE = 0.25
+PREVIEW_DIR = os.path.join(TEMP_DIR, "previews")
+PREVIEW_DIR_MAX_BYTES = 64 * 1024 * 1024
+
+# 동시에 실행할 렌더링 작업 수
+MAX_CONCURRENT_RENDERS = int(os.environ.get("QUOTE_MAKER_MAX_RENDERS", "2"))
+# 작업별 작업 폴더 (업로드/결과물). 보존 시간과 전체 용량을 넘으면 오래된 것부터 삭제
+JOB_DIR = os.path.join(TEMP_DIR, "jobs")
+JOB_TTL_SECONDS = int(os.environ.get("QUOTE_MAKER_JOB_TTL", "3600"))
+JOB_DIR_MAX_BYTES = int(os.environ.get("QUOTE_MAKER_JOB_MAX_MB", "2048")) * 1024 * 1024
+# 렌더링 계측: 작업별 기록(JSONL)과 Prometheus 텍스트 형식 누적 지표 파일 (빈 값이면 기록 안 함)
+METRICS_DIR = os.path.join(TEMP_DIR, "metrics")
+METRICS_LOG = os.environ.get("QUOTE_MAKER_METRICS_LOG", os.path.join(METRICS_DIR, "render_jobs.jsonl"))
+METRICS_PROM_FILE = os.environ.get("QUOTE_MAKER_METRICS_PROM", os.path.join(METRICS_DIR, "quote_maker.prom"))
+
+AVAILABLE_FONTS = {
+    "Gmarket Sans Bold": os.path.join(FONT_DIR, "GmarketSansTTFBold.ttf"),
+    "Gmarket Sans Medium": os.path.join(FONT_DIR, "GmarketSansTTFMedium.ttf"),
+    "Noto Sans KR Regular": os.path.join(FONT_DIR, "NotoSansKR-Regular.ttf"),
+    "Noto Sans KR Bold": os.path.join(FONT_DIR, "NotoSansKR-Bold.ttf"),
+    "SCDream 5": os.path.join(FONT_DIR, "SCDream5.otf"),
+    "SCDream 6": os.path.join(FONT_DIR, "SCDream6.otf"),
+    "Binggrae Bold": os.path.join(FONT_DIR, "BinggraeII-Bold.ttf"),
+}
@@ -0,0 +1,122 @@
+"""ffmpeg 실행 도우미"""
+
+import os
+import queue
+import subprocess
+import threading
+
+from .config import ENCODE_QUEUE_FRAMES
+
+
+def ffmpeg_binary():
+    """MoviePy가 사용하는 ffmpeg 실행 파일 경로"""
+    from moviepy.config import get_setting
+
+    return get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(args, input_bytes=None):
+    """ffmpeg 실행 (실패하면 CalledProcessError)"""
+    command = [ffmpeg_binary(), "-y", "-loglevel", "error", *args]
+    return subprocess.run(command, input=input_bytes, check=True, capture_output=True)
+
+
+def run_ffmpeg_with_progress(args, on_frame):
+    """ffmpeg를 실행하면서 지금까지 출력한 프레임 수를 on_frame(frames)로 알림 (실패하면 CalledProcessError)
+
+    on_frame이 예외를 던지면(취소 등) ffmpeg를 종료하고 예외를 그대로 전달한다.
+    """
+    command = [ffmpeg_binary(), "-y", "-loglevel", "error", "-nostats", "-progress", "pipe:1", *args]
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        # 진행 상황(stdout)을 읽는 동안 오류 출력(stderr) 파이프가 차서 멈추지 않도록 따로 읽음
+        stderr_chunks = []
+        reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        reader.start()
+        try:
+            for line in process.stdout:
+                if line.startswith(b"frame="):
+                    on_frame(int(line[6:]))
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            reader.join()
+            returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, stderr=b"".join(stderr_chunks))
+
+
+def run_ffmpeg_with_frames(args, frames, queue_size=ENCODE_QUEUE_FRAMES):
+    """프레임을 만들면서 동시에 ffmpeg stdin으로 흘려 보내며 실행
+
+    frames는 이 스레드에서 생성하고, 쓰기는 별도 스레드가 크기 제한 큐에서 꺼내 처리한다.
+    그래서 Python이 다음 프레임을 합성하는 동안 ffmpeg가 쉬지 않고, 메모리는 queue_size 프레임까지만 쓴다.
+    """
+    command = [ffmpeg_binary(), "-y", "-loglevel", "error", *args]
+    # with 블록이 성공/실패/취소 어느 경우든 파이프를 닫고 프로세스를 회수함
+    with subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        pending = queue.Queue(maxsize=max(1, queue_size))
+
+        def write_frames():
+            broken = False
+            while True:
+                chunk = pending.get()
+                if chunk is None:
+                    break
+                if broken:
+                    # ffmpeg가 먼저 종료됨: 생산자가 막히지 않도록 나머지는 버림 (아래에서 종료 코드로 판단)
+                    continue
+                try:
+                    process.stdin.write(chunk)
+                except (BrokenPipeError, OSError):
+                    broken = True
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+        writer = threading.Thread(target=write_frames, daemon=True)
+        writer.start()
+        try:
+            for frame in frames:
+                # 합성 버퍼는 재사용되므로 큐에는 복사본을 넣음
+                pending.put(bytes(frame))
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            pending.put(None)
+            writer.join()
+            stderr = process.stderr.read()
+            returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, stderr=stderr)
+
+
+def probe_duration(video_path):
+    """영상 길이(초). 디코딩 없이 헤더만 읽음"""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+    return ffmpeg_parse_infos(video_path).get("duration") or 0
+
+
+def prune_directory(directory, max_bytes):
+    """오래 쓰지 않은 파일부터 지워 폴더 크기를 max_bytes 이하로 유지"""
+    entries = []
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
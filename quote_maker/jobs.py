@@ -0,0 +1,328 @@
+"""렌더링 작업 큐: 작업 명세를 프로세스 풀에 넘기고 진행 상황/취소를 관리"""
+
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from .config import (
+    DEFAULT_LINE_DURATION,
+    DEFAULT_RENDER_BACKEND,
+    DEFAULT_RENDER_PROFILE,
+    JOB_DIR,
+    JOB_DIR_MAX_BYTES,
+    JOB_TTL_SECONDS,
+    MAX_CONCURRENT_RENDERS,
+)
+from .metrics import PeakMemoryMonitor, RenderMetrics, record_render_job
+from .render_cache import fetch_cached_render, render_cache_key, store_render
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+@dataclass(frozen=True)
+class RenderJobSpec:
+    """렌더링 작업 명세. 작업 프로세스로 넘어가므로 경로/값만 담음"""
+
+    title: str
+    lines: tuple
+    style_options: dict
+    output_file: str
+    bg_video_path: str = None
+    bg_image_path: str = None
+    music_path: str = None
+    music_volume: float = 0.3
+    line_duration: float = DEFAULT_LINE_DURATION
+    profile: str = DEFAULT_RENDER_PROFILE
+    backend: str = DEFAULT_RENDER_BACKEND
+
+
+class RenderCancelled(Exception):
+    """사용자가 작업을 취소함"""
+
+
+def job_workdir(job_id):
+    """작업 전용 폴더 경로 (업로드 파일과 결과 영상을 둠)"""
+    return os.path.join(JOB_DIR, job_id)
+
+
+def _dir_usage(path):
+    """폴더의 (가장 최근 수정 시각, 전체 크기)"""
+    latest = os.stat(path).st_mtime
+    total = 0
+    for root, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(root, filename))
+            except OSError:
+                continue
+            latest = max(latest, stat.st_mtime)
+            total += stat.st_size
+    return latest, total
+
+
+def sweep_job_dirs(keep=(), ttl=JOB_TTL_SECONDS, max_bytes=JOB_DIR_MAX_BYTES):
+    """보존 시간이 지난 작업 폴더를 지우고, 전체 용량이 max_bytes를 넘으면 오래된 폴더부터 삭제
+
+    keep에 있는 작업(대기/실행 중)의 폴더는 건드리지 않는다.
+    """
+    if not os.path.isdir(JOB_DIR):
+        return
+    now = time.time()
+    entries = []
+    for job_id in os.listdir(JOB_DIR):
+        path = os.path.join(JOB_DIR, job_id)
+        if job_id in keep or not os.path.isdir(path):
+            continue
+        try:
+            latest, size = _dir_usage(path)
+        except OSError:
+            continue
+        if now - latest > ttl:
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            entries.append((latest, size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def _run_job(job_id, spec, states, cancel_flags, cache_key=None):
+    """작업 프로세스에서 실행: 진행 상황을 states에 기록하고 취소 요청을 확인"""
+    from .render import BackgroundLoadError, render_video
+
+    state = dict(states[job_id])
+    if cancel_flags.get(job_id):
+        # 실행 대기열에 이미 들어가 future.cancel()이 안 된 작업
+        state.update(status=CANCELLED, message="작업이 취소되었습니다.", finished_at=time.time())
+        states[job_id] = state
+        return CANCELLED
+    state.update(status=RUNNING, progress=5, message="1️⃣ 배경 준비 중...", started_at=time.time())
+    states[job_id] = state
+
+    def on_progress(percent, message=None):
+        if cancel_flags.get(job_id):
+            raise RenderCancelled()
+        changed = False
+        if percent is not None and percent != state["progress"]:
+            state["progress"] = percent
+            changed = True
+        if message and message != state["message"]:
+            state["message"] = message
+            changed = True
+        if changed:
+            states[job_id] = state
+
+    monitor = PeakMemoryMonitor()
+    metrics = RenderMetrics()
+    try:
+        with monitor:
+            render_video(
+                spec.title,
+                list(spec.lines),
+                spec.style_options,
+                spec.output_file,
+                bg_video_path=spec.bg_video_path,
+                bg_image_path=spec.bg_image_path,
+                music_path=spec.music_path,
+                music_volume=spec.music_volume,
+                line_duration=spec.line_duration,
+                profile=spec.profile,
+                backend=spec.backend,
+                on_progress=on_progress,
+                metrics=metrics,
+            )
+    except RenderCancelled:
+        state.update(status=CANCELLED, message="작업이 취소되었습니다.")
+    except BackgroundLoadError as e:
+        state.update(status=FAILED, error=f"배경 영상을 불러오는 중 오류가 발생했습니다: {e}")
+    except Exception as e:
+        state.update(status=FAILED, error=f"오류 발생: {e}")
+    else:
+        if cache_key:
+            try:
+                store_render(cache_key, spec.output_file)
+            except OSError:
+                pass
+        state.update(status=DONE, progress=100, message="🎉 영상 생성 완료!", output_file=spec.output_file)
+    if state["status"] != DONE and os.path.exists(spec.output_file):
+        # 중단된 작업이 쓰다 만 영상은 바로 삭제
+        os.remove(spec.output_file)
+    # 작업 프로세스와 ffmpeg 등 자식 프로세스를 합친 최대 메모리 사용량
+    state["peak_rss_mb"] = monitor.peak_mb
+    state["finished_at"] = time.time()
+    state["metrics"] = metrics.as_dict()
+    states[job_id] = state
+    _record_job(job_id, spec, state)
+    return state["status"]
+
+
+def _record_job(job_id, spec, state):
+    """끝난 작업을 지표 로그/파일에 기록"""
+    started_at = state.get("started_at", state["submitted_at"])
+    record_render_job(
+        {
+            "job_id": job_id,
+            "status": state["status"],
+            "cached": state["cached"],
+            "backend": spec.backend,
+            "profile": spec.profile,
+            "lines": len(spec.lines),
+            "line_duration": spec.line_duration,
+            "wall_s": round(state["finished_at"] - started_at, 3),
+            "peak_rss_mb": state["peak_rss_mb"],
+            "error": state["error"],
+            **(state.get("metrics") or {}),
+        }
+    )
+
+
+class RenderQueue:
+    """렌더링 작업을 최대 max_workers개까지 별도 프로세스에서 동시에 실행"""
+
+    def __init__(self, max_workers=MAX_CONCURRENT_RENDERS):
+        self.max_workers = max(1, int(max_workers))
+        # Streamlit 서버는 여러 스레드를 쓰므로 fork 대신 spawn으로 작업 프로세스 생성
+        self._context = multiprocessing.get_context("spawn")
+        self._manager = self._context.Manager()
+        self._states = self._manager.dict()
+        self._cancel_flags = self._manager.dict()
+        self._executor = self._new_executor()
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+
+    def _replace_broken_executor(self, broken):
+        """작업 프로세스가 강제 종료(메모리 부족 등)되어 못 쓰게 된 풀을 새 풀로 교체
+
+        그 풀에 있던 작업들은 future가 BrokenProcessPool로 끝나므로 _on_done에서 실패로 기록된다.
+        """
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def new_job(self):
+        """새 작업 ID와 전용 폴더를 만들어 (job_id, workdir) 반환 (오래된 작업 폴더도 함께 정리)"""
+        sweep_job_dirs(keep=self._active_ids())
+        job_id = uuid.uuid4().hex[:12]
+        workdir = job_workdir(job_id)
+        os.makedirs(workdir)
+        return job_id, workdir
+
+    def submit(self, spec, job_id=None):
+        """작업을 등록하고 작업 ID 반환 (job_id는 new_job()으로 받은 것)"""
+        if job_id is None:
+            job_id, _ = self.new_job()
+        now = time.time()
+        cache_key = render_cache_key(spec)
+        if fetch_cached_render(cache_key, spec.output_file):
+            # 같은 입력으로 만든 영상이 있으면 작업 프로세스를 거치지 않고 바로 완료 처리
+            self._states[job_id] = {
+                "status": DONE,
+                "progress": 100,
+                "message": "🎉 영상 생성 완료! (이전에 만든 영상을 재사용했어요)",
+                "output_file": spec.output_file,
+                "error": None,
+                "cached": True,
+                "peak_rss_mb": None,
+                "submitted_at": now,
+                "finished_at": now,
+            }
+            _record_job(job_id, spec, self._states[job_id])
+            return job_id
+
+        self._states[job_id] = {
+            "status": QUEUED,
+            "progress": 0,
+            "message": "⏳ 렌더링 대기 중...",
+            "output_file": None,
+            "error": None,
+            "cached": False,
+            "peak_rss_mb": None,
+            "submitted_at": now,
+        }
+        executor = self._executor
+        try:
+            future = executor.submit(_run_job, job_id, spec, self._states, self._cancel_flags, cache_key)
+        except BrokenProcessPool:
+            self._replace_broken_executor(executor)
+            executor = self._executor
+            future = executor.submit(_run_job, job_id, spec, self._states, self._cancel_flags, cache_key)
+        future.add_done_callback(lambda f: self._on_done(job_id, f, executor))
+        with self._lock:
+            self._futures[job_id] = future
+        return job_id
+
+    def _on_done(self, job_id, future, executor):
+        # 작업 프로세스가 비정상 종료한 경우 등 _run_job이 상태를 남기지 못한 경우 처리
+        if future.cancelled() or future.exception() is None:
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # 다음 작업부터는 새 풀에서 실행
+            self._replace_broken_executor(executor)
+            message = "렌더링 프로세스가 비정상 종료되었습니다 (메모리 부족 등). 다시 시도해주세요."
+        else:
+            message = f"오류 발생: {error}"
+        state = dict(self._states.get(job_id) or {})
+        if state.get("status") in ACTIVE_STATES:
+            state.update(status=FAILED, error=message, finished_at=time.time())
+            self._states[job_id] = state
+
+    def status(self, job_id):
+        """작업 상태 dict (없는 작업이면 None)"""
+        state = self._states.get(job_id)
+        return dict(state) if state is not None else None
+
+    def cancel(self, job_id):
+        """대기 중이면 바로 취소하고, 실행 중이면 다음 진행 보고 시점에 중단하도록 요청"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            state = dict(self._states.get(job_id) or {})
+            state.update(status=CANCELLED, message="작업이 취소되었습니다.", finished_at=time.time())
+            self._states[job_id] = state
+            return
+        self._cancel_flags[job_id] = True
+
+    def forget(self, job_id):
+        """끝난 작업의 상태 기록과 작업 폴더 삭제 (실행 중이면 취소 요청만 하고 폴더는 정리 때 삭제)"""
+        state = self.status(job_id)
+        if state is not None and state["status"] in ACTIVE_STATES:
+            self.cancel(job_id)
+            return
+        with self._lock:
+            self._futures.pop(job_id, None)
+        self._states.pop(job_id, None)
+        self._cancel_flags.pop(job_id, None)
+        shutil.rmtree(job_workdir(job_id), ignore_errors=True)
+
+    def _active_ids(self):
+        return {job_id for job_id, state in self._states.items() if state.get("status") in ACTIVE_STATES}
+
+    def active_count(self):
+        """대기/실행 중인 작업 수"""
+        return len(self._active_ids())
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._manager.shutdown()
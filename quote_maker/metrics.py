@@ -0,0 +1,319 @@
+"""렌더링 작업의 자원 사용량 측정과 기록
+
+단계(stage)별 벽시계 시간/CPU 시간/최대 메모리를 재고, 끝난 작업은 JSONL 로그에 한 줄씩 덧붙이며
+누적 카운터는 Prometheus 텍스트 형식 파일(node_exporter textfile 수집기 등으로 읽음)에 갱신한다.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import METRICS_LOG, METRICS_PROM_FILE
+
+try:
+    import fcntl
+    import resource
+except ImportError:  # Windows
+    fcntl = None
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _child_pids(pid):
+    """직계 자식 프로세스 ID 목록 (/proc가 없으면 빈 목록)"""
+    children = []
+    try:
+        task_ids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task_id in task_ids:
+        try:
+            with open(f"/proc/{pid}/task/{task_id}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return children
+
+
+def _process_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_rss(pid=None):
+    """pid와 그 자식 프로세스(ffmpeg, 구간 인코딩 프로세스 등) 전체의 현재 RSS(바이트). /proc가 없으면 None"""
+    pid = pid or os.getpid()
+    if not os.path.exists(f"/proc/{pid}/statm"):
+        return None
+    total = 0
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        total += _process_rss(current)
+        pending.extend(_child_pids(current))
+    return total
+
+
+def _max_rss_self():
+    """이 프로세스가 지금까지 쓴 최대 RSS(바이트). 측정할 수 없으면 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class PeakMemoryMonitor:
+    """with 블록 동안 프로세스 트리의 RSS를 주기적으로 재서 최댓값을 기록
+
+    /proc가 없는 환경에서는 이 프로세스의 최대 RSS(getrusage)로 대신한다.
+    여러 프로세스가 함께 쓰는 공유 메모리(배경 프레임)는 프로세스마다 더해지므로 실제보다 크게 나올 수 있다.
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_bytes = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = process_tree_rss()
+        if rss is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        if self.peak_bytes is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._sample()
+        else:
+            self.peak_bytes = _max_rss_self()
+        return False
+
+    @property
+    def peak_mb(self):
+        """최대 RSS(MB, 소수 첫째 자리). 측정할 수 없으면 None"""
+        return None if self.peak_bytes is None else round(self.peak_bytes / (1024 * 1024), 1)
+
+
+def cpu_seconds():
+    """이 프로세스와 종료/회수된 자식 프로세스(ffmpeg 등)의 누적 CPU 시간(초)"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class RenderMetrics:
+    """렌더링 한 번의 단계별 시간/메모리와 인코딩 프레임 수
+
+    단계 안에서 다른 단계를 열면 바깥 단계의 시간에서 안쪽 단계 시간을 빼서 단계끼리 겹치지 않게 한다.
+    최대 메모리는 단계 동안의 프로세스 트리 RSS 최댓값이다.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.frames_encoded = 0
+        self._open = []
+        self._lock = threading.Lock()
+
+    def _entry(self, name):
+        return self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None})
+
+    @contextmanager
+    def stage(self, name):
+        """with 블록을 name 단계로 측정"""
+        frame = {"child_wall": 0.0, "child_cpu": 0.0, "extra_cpu": 0.0}
+        with self._lock:
+            self._open.append(frame)
+        started_wall, started_cpu = time.perf_counter(), cpu_seconds()
+        monitor = PeakMemoryMonitor()
+        try:
+            with monitor:
+                yield
+        finally:
+            wall = time.perf_counter() - started_wall
+            cpu = cpu_seconds() - started_cpu + frame["extra_cpu"]
+            with self._lock:
+                # 내용이 같은 다른 단계와 헷갈리지 않도록 객체 자체로 찾아 제거
+                del self._open[next(i for i, item in enumerate(self._open) if item is frame)]
+                if self._open:
+                    self._open[-1]["child_wall"] += wall
+                    self._open[-1]["child_cpu"] += cpu
+                entry = self._entry(name)
+                entry["wall_s"] += wall - frame["child_wall"]
+                entry["cpu_s"] += cpu - frame["child_cpu"]
+                if monitor.peak_mb is not None:
+                    entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0, monitor.peak_mb)
+
+    def add_time(self, name, wall_s, cpu_s):
+        """단계로 감쌀 수 없는 작업(다른 단계 안에서 조금씩 나뉘어 실행되는 합성 등)의 누적 시간을 더함
+
+        안쪽 단계와 마찬가지로 지금 열려 있는 단계의 시간에서는 그만큼 뺀다.
+        """
+        with self._lock:
+            entry = self._entry(name)
+            entry["wall_s"] += wall_s
+            entry["cpu_s"] += cpu_s
+            if self._open:
+                self._open[-1]["child_wall"] += wall_s
+                self._open[-1]["child_cpu"] += cpu_s
+
+    def add_cpu(self, cpu_s):
+        """지금 열려 있는 단계에 다른 프로세스(구간 인코딩 프로세스 등)가 쓴 CPU 시간을 더함"""
+        with self._lock:
+            if self._open:
+                self._open[-1]["extra_cpu"] += cpu_s
+
+    def add_frames(self, count):
+        with self._lock:
+            self.frames_encoded += count
+
+    def as_dict(self):
+        """기록용 dict (초는 소수 셋째 자리, encode_fps는 합성을 포함한 인코딩 시간 기준)"""
+        stages = {
+            name: {
+                "wall_s": round(entry["wall_s"], 3),
+                "cpu_s": round(entry["cpu_s"], 3),
+                "peak_rss_mb": entry["peak_rss_mb"],
+            }
+            for name, entry in self.stages.items()
+        }
+        encode_wall = sum(self.stages.get(name, {}).get("wall_s", 0.0) for name in ("encode", "composite"))
+        encode_fps = round(self.frames_encoded / encode_wall, 2) if encode_wall and self.frames_encoded else None
+        return {"stages": stages, "frames_encoded": self.frames_encoded, "encode_fps": encode_fps}
+
+
+@contextmanager
+def _locked(path):
+    """여러 프로세스가 같은 지표 파일을 갱신하지 않도록 잠금 (fcntl이 없으면 잠그지 않음)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _label(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _prometheus_text(counters):
+    """누적 카운터 dict를 Prometheus 텍스트 형식으로 변환"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {round(value, 3) if isinstance(value, float) else value}")
+
+    metric(
+        "quote_maker_render_jobs_total",
+        "counter",
+        "끝난 렌더링 작업 수",
+        [(_label(**json.loads(key)), value) for key, value in sorted(counters["jobs"].items())],
+    )
+    metric("quote_maker_render_seconds_total", "counter", "렌더링 작업 전체 벽시계 시간(초)", [("", counters["seconds"])])
+    metric(
+        "quote_maker_render_stage_seconds_total",
+        "counter",
+        "단계별 벽시계 시간(초)",
+        [(_label(stage=stage), value["wall_s"]) for stage, value in sorted(counters["stages"].items())],
+    )
+    metric(
+        "quote_maker_render_stage_cpu_seconds_total",
+        "counter",
+        "단계별 CPU 시간(초, ffmpeg/인코딩 프로세스 포함)",
+        [(_label(stage=stage), value["cpu_s"]) for stage, value in sorted(counters["stages"].items())],
+    )
+    metric("quote_maker_render_frames_encoded_total", "counter", "인코딩한 프레임 수", [("", counters["frames"])])
+    for name, help_text in (
+        ("last_peak_rss_bytes", "마지막 작업의 최대 RSS(바이트)"),
+        ("max_peak_rss_bytes", "지금까지 작업 중 가장 큰 최대 RSS(바이트)"),
+        ("last_encode_fps", "마지막 작업의 인코딩 속도(프레임/초)"),
+    ):
+        if counters.get(name) is not None:
+            metric(f"quote_maker_render_{name}", "gauge", help_text, [("", counters[name])])
+    return "\n".join(lines) + "\n"
+
+
+def _update_prometheus(record, prom_file):
+    state_path = f"{prom_file}.json"
+    with _locked(prom_file):
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                counters = json.load(f)
+        except (OSError, ValueError):
+            counters = {"jobs": {}, "seconds": 0.0, "stages": {}, "frames": 0}
+
+        job_key = json.dumps(
+            {"status": record["status"], "backend": record.get("backend") or "", "profile": record.get("profile") or "", "cached": str(record["cached"]).lower()},
+            sort_keys=True,
+        )
+        counters["jobs"][job_key] = counters["jobs"].get(job_key, 0) + 1
+        counters["seconds"] += record["wall_s"] or 0
+        for stage, values in record["stages"].items():
+            total = counters["stages"].setdefault(stage, {"wall_s": 0.0, "cpu_s": 0.0})
+            total["wall_s"] += values["wall_s"]
+            total["cpu_s"] += values["cpu_s"]
+        counters["frames"] += record["frames_encoded"]
+        if record.get("peak_rss_mb") is not None:
+            peak_bytes = int(record["peak_rss_mb"] * 1024 * 1024)
+            counters["last_peak_rss_bytes"] = peak_bytes
+            counters["max_peak_rss_bytes"] = max(counters.get("max_peak_rss_bytes") or 0, peak_bytes)
+        if record.get("encode_fps") is not None:
+            counters["last_encode_fps"] = record["encode_fps"]
+
+        # 읽는 쪽이 반쯤 쓴 파일을 보지 않도록 임시 파일에 쓰고 교체
+        for path, text in ((state_path, json.dumps(counters)), (prom_file, _prometheus_text(counters))):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+
+def record_render_job(record, log_file=METRICS_LOG, prom_file=METRICS_PROM_FILE):
+    """끝난 작업 기록(dict)을 JSONL 로그에 덧붙이고 Prometheus 지표 파일을 갱신
+
+    record에는 status, cached, wall_s가 필요하고, 그 밖의 값(job_id, backend, profile, peak_rss_mb,
+    RenderMetrics.as_dict()의 값 등)은 있는 만큼 기록된다. 기록 실패는 렌더링 결과에 영향을 주지 않도록 무시한다.
+    """
+    record = dict(record)
+    for key, default in (("stages", {}), ("frames_encoded", 0), ("encode_fps", None)):
+        record.setdefault(key, default)
+    record["recorded_at"] = round(time.time(), 3)
+    try:
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with _locked(log_file), open(log_file, "a", encoding="utf-8") as f:
+                f.write(line)
+        if prom_file:
+            _update_prometheus(record, prom_file)
+    except OSError:
+        pass
+    return record
@@ -0,0 +1,100 @@
+"""저해상도 미리보기: 인코딩 없이 장면별 정지 화면만 빠르게 그림"""
+
+import hashlib
+import os
+import uuid
+
+from PIL import Image
+
+from .background import prepare_image_background, video_preview_frame
+from .caching import shared_cache
+from .config import PREVIEW_DIR, PREVIEW_DIR_MAX_BYTES, PREVIEW_SCALE, VIDEO_HEIGHT, VIDEO_WIDTH
+from .ffmpeg import prune_directory
+from .text import create_text_overlay, scene_renderer
+
+
+def preview_size(scale=PREVIEW_SCALE):
+    """출력 해상도에 scale을 곱한 미리보기 크기 (짝수로 맞춤)"""
+    return (max(2, int(VIDEO_WIDTH * scale) // 2 * 2), max(2, int(VIDEO_HEIGHT * scale) // 2 * 2))
+
+
+def store_preview_upload(data, ext):
+    """미리보기용 업로드 이미지를 내용 해시 이름으로 저장하고 경로 반환 (같은 파일이면 다시 쓰지 않음)"""
+    path = os.path.join(PREVIEW_DIR, f"{hashlib.sha1(data).hexdigest()[:16]}.{ext}")
+    if not os.path.exists(path):
+        os.makedirs(PREVIEW_DIR, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        prune_directory(PREVIEW_DIR, PREVIEW_DIR_MAX_BYTES)
+    return path
+
+
+def _preview_background(style_options, size, bg_video_path=None, bg_image_path=None):
+    darkness = int(style_options.get("overlay_darkness", 0))
+    if bg_image_path:
+        # 흐림 반경도 배율에 맞춰 줄여야 실제 결과와 비슷하게 보임
+        blur = style_options.get("overlay_blur", 0) * size[0] / VIDEO_WIDTH
+        return prepare_image_background(bg_image_path, size, darkness, blur)
+
+    if bg_video_path:
+        background = video_preview_frame(bg_video_path, size).convert("RGBA")
+    else:
+        background = Image.new("RGBA", size, (0, 0, 0, 255))
+    if darkness > 0:
+        background = Image.alpha_composite(background, Image.new("RGBA", size, (0, 0, 0, darkness)))
+    return background
+
+
+def _text_options(style_options):
+    """텍스트 레이어에 영향을 주는 옵션만 (어둡게/흐림은 배경에서 처리)"""
+    return {name: value for name, value in style_options.items() if name not in ("overlay_darkness", "overlay_blur")}
+
+
+def _scaled_overlay(title, lines, style_options, highlight_idx, size):
+    """highlight_idx 상태의 텍스트 레이어를 size로 줄인 RGBA 이미지 (렌더러 상태/크기별로 캐시)"""
+    text_options = _text_options(style_options)
+    renderer = scene_renderer(title, lines, video_size=(VIDEO_WIDTH, VIDEO_HEIGHT), **text_options)
+    options_key = tuple(
+        sorted((name, tuple(sorted(value.items())) if isinstance(value, dict) else value) for name, value in text_options.items())
+    )
+    key = (title, tuple(lines), options_key, renderer.state_key(highlight_idx), size)
+    return shared_cache("preview_overlays", 32).get_or_create(
+        key,
+        lambda: create_text_overlay(
+            title,
+            lines,
+            highlight_idx,
+            overlay_darkness=0,
+            video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+            **text_options,
+        ).resize(size, Image.Resampling.BOX),
+    )
+
+
+def render_preview(title, lines, style_options, highlight_idx, *, bg_video_path=None, bg_image_path=None, scale=PREVIEW_SCALE):
+    """highlight_idx 장면(-1이면 인트로)을 scale 배율로 그린 RGB 이미지
+
+    배치/글자 조각은 실제 렌더링과 같은 캐시를 쓰고, 배경과 축소한 텍스트 레이어도 캐시해 재사용한다.
+    """
+    size = preview_size(scale)
+    canvas = _preview_background(style_options, size, bg_video_path, bg_image_path).copy()
+    canvas.alpha_composite(_scaled_overlay(title, lines, style_options, highlight_idx, size))
+    return canvas.convert("RGB")
+
+
+def render_previews(title, lines, style_options, **options):
+    """인트로(-1)와 본문 줄마다의 미리보기 [(highlight_idx, 이미지), ...]
+
+    그린 결과가 같은 상태(본문 줄들)는 한 번만 그리고 같은 이미지를 돌려준다.
+    """
+    renderer = scene_renderer(title, lines, video_size=(VIDEO_WIDTH, VIDEO_HEIGHT), **_text_options(style_options))
+    images = {}
+    previews = []
+    for highlight_idx in range(-1, len(lines)):
+        state = renderer.state_key(highlight_idx)
+        if state not in images:
+            images[state] = render_preview(title, lines, style_options, highlight_idx, **options)
+        previews.append((highlight_idx, images[state]))
+    return previews
@@ -0,0 +1,263 @@
+"""명언 영상 렌더링 파이프라인: 배경 준비 → 줄별 장면 생성 → 인코딩 → 음악 입히기"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+from .audio import encode_music_track
+from .background import ensure_normalized_video, prepare_image_background, prepare_video_background
+from .config import (
+    DEFAULT_LINE_DURATION,
+    DEFAULT_RENDER_BACKEND,
+    DEFAULT_RENDER_PROFILE,
+    SEGMENT_WORKERS,
+    TEMP_DIR,
+    VIDEO_FPS,
+    VIDEO_HEIGHT,
+    VIDEO_WIDTH,
+)
+from .metrics import RenderMetrics
+from .render_cache import file_digest
+from .text import create_text_image, create_text_overlay
+from .video import concat_segments, encode_filtergraph_video, encode_overlay_segments, encode_still_segment
+
+
+class BackgroundLoadError(Exception):
+    """배경 영상을 불러오지 못함"""
+
+
+def render_video(
+    title,
+    lines,
+    style_options,
+    output_file,
+    *,
+    bg_video_path=None,
+    bg_image_path=None,
+    music_path=None,
+    music_volume=0.3,
+    line_duration=DEFAULT_LINE_DURATION,
+    profile=DEFAULT_RENDER_PROFILE,
+    backend=DEFAULT_RENDER_BACKEND,
+    segment_workers=SEGMENT_WORKERS,
+    on_progress=None,
+    metrics=None,
+):
+    """본문 한 줄당 한 구간씩 명언 영상을 만들어 output_file에 저장
+
+    profile은 RENDER_PROFILES의 이름(인코딩 preset/CRF/해상도 배율)이고,
+    backend는 RENDER_BACKENDS의 이름("segments": 구간별 NumPy 합성, "ffmpeg": 필터그래프 한 번)이다.
+    segment_workers는 새로 만들 구간을 동시에 인코딩할 프로세스 수이다 (1이면 이 프로세스에서 순서대로).
+    on_progress(percent, message)는 진행률(0~100, 없으면 None)과 단계 메시지(없으면 None)를 받고,
+    인코딩 중 진행률은 실제로 인코딩한 프레임 수로 계산한다.
+    metrics(RenderMetrics)가 있으면 단계별(background, overlays, composite, encode, audio, mux) 시간/메모리를 기록한다.
+    """
+    report = on_progress or (lambda percent, message=None: None)
+    metrics = metrics or RenderMetrics()
+    if backend == "ffmpeg":
+        return _render_with_filtergraph(
+            title,
+            lines,
+            style_options,
+            output_file,
+            bg_video_path=bg_video_path,
+            bg_image_path=bg_image_path,
+            music_path=music_path,
+            music_volume=music_volume,
+            line_duration=line_duration,
+            profile=profile,
+            report=report,
+            metrics=metrics,
+        )
+
+    segment_paths = []
+    on_frames = _frame_progress(report, 30, 90)
+
+    if bg_video_path:
+        darkness = style_options["overlay_darkness"]
+        # 구간 캐시가 모두 있으면 배경 영상은 디코딩하지 않음
+        background_key = f"{file_digest(bg_video_path)}|{darkness}"
+
+        def load_background():
+            report(None, "⏳ 배경 영상 디코딩 중...")
+            try:
+                with metrics.stage("background"):
+                    # 어둡게 처리는 배경 프레임에 한 번만 적용하고, 오버레이에는 글자만 그림
+                    return prepare_video_background(bg_video_path, line_duration, darkness=darkness)
+            except Exception as e:
+                raise BackgroundLoadError(str(e)) from e
+
+    report(20, "2️⃣ 장면 생성 중...")
+
+    if bg_video_path:
+        overlay_imgs = []
+        with metrics.stage("overlays"):
+            for i, line in enumerate(lines):
+                overlay_imgs.append(
+                    create_text_overlay(
+                        title,
+                        lines,
+                        i,
+                        **{**style_options, "overlay_darkness": 0, "overlay_blur": 0},
+                        video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+                    )
+                )
+                report(20 + int(10 * (i + 1) / len(lines)))
+
+        # 화면이 같은 구간은 같은 조각을 재사용하므로 바뀐 화면의 구간만 새로 인코딩됨.
+        # 지금은 본문 줄마다 화면이 같아 구간 하나만 인코딩하고 나머지는 그 구간을 다시 씀
+        with metrics.stage("encode"):
+            segment_paths = encode_overlay_segments(
+                overlay_imgs,
+                background_key,
+                load_background,
+                line_duration,
+                profile=profile,
+                workers=segment_workers,
+                on_frames=on_frames,
+                metrics=metrics,
+            )
+    else:
+        with metrics.stage("background"):
+            # create_text_image()가 같은 캐시에서 꺼내 쓰도록 배경 전처리만 먼저 해 둠
+            prepare_image_background(
+                bg_image_path,
+                (VIDEO_WIDTH, VIDEO_HEIGHT),
+                style_options["overlay_darkness"],
+                style_options["overlay_blur"],
+            )
+        frame_count = max(1, int(round(line_duration * VIDEO_FPS)))
+        for i, line in enumerate(lines):
+            with metrics.stage("overlays"):
+                img = create_text_image(
+                    bg_image_path,
+                    title,
+                    lines,
+                    i,
+                    **style_options,
+                    video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+                )
+            with metrics.stage("encode"):
+                segment_paths.append(
+                    encode_still_segment(np.asarray(img), line_duration, profile=profile, metrics=metrics)
+                )
+            on_frames((i + 1) * frame_count, len(lines) * frame_count)
+
+    duration = len(segment_paths) * line_duration
+    audio_track = _prepare_audio(music_path, duration, music_volume, report, metrics, 92)
+
+    report(95, "5️⃣ 최종 합치는 중...")
+    # 구간 조각들을 재인코딩 없이 이어 붙이고 음악 트랙을 입힘
+    with metrics.stage("mux"):
+        concat_segments(segment_paths, output_file, duration=duration, audio_track=audio_track)
+    return output_file
+
+
+def _frame_progress(report, start, end):
+    """on_frames(완료, 전체) 콜백: 프레임 수를 start~end 진행률로 바꿔 보고 (진행률이 바뀔 때만 메시지 갱신)"""
+    last = {"percent": None}
+
+    def on_frames(done, total):
+        percent = start + int((end - start) * done / max(1, total))
+        if percent != last["percent"]:
+            last["percent"] = percent
+            report(percent, f"3️⃣ 인코딩 중... ({done}/{total} 프레임)")
+        else:
+            # 진행률이 같아도 취소 요청은 프레임마다 확인
+            report(None)
+
+    return on_frames
+
+
+def _prepare_audio(music_path, duration, music_volume, report, metrics, percent):
+    """배경음악을 영상 길이/볼륨에 맞춘 AAC 트랙으로 준비 (음악이 없으면 None)"""
+    if not music_path:
+        return None
+    report(percent, "4️⃣ 음악 준비 중...")
+    with metrics.stage("audio"):
+        return encode_music_track(music_path, duration, music_volume)
+
+
+def _render_with_filtergraph(
+    title,
+    lines,
+    style_options,
+    output_file,
+    *,
+    bg_video_path,
+    bg_image_path,
+    music_path,
+    music_volume,
+    line_duration,
+    profile,
+    report,
+    metrics,
+):
+    """오버레이 PNG만 Python에서 그리고, 배경 처리/합성/인코딩은 ffmpeg 필터그래프에 맡김"""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=TEMP_DIR) as work_dir:
+        darkness = 0
+        with metrics.stage("background"):
+            if bg_video_path:
+                if not os.path.exists(bg_video_path):
+                    raise BackgroundLoadError(f"파일이 없습니다: {bg_video_path}")
+                try:
+                    # 이미 규격에 맞춘 사본이 있으면 필터그래프의 크기 조정이 가벼워짐
+                    background_path = ensure_normalized_video(bg_video_path)
+                except (OSError, subprocess.CalledProcessError):
+                    background_path = bg_video_path
+                darkness = style_options["overlay_darkness"]
+            else:
+                # 이미지 배경은 정지 화면 한 장이므로 어둡게/흐림까지 적용한 배경을 한 번만 만들어 넘김
+                background = prepare_image_background(
+                    bg_image_path,
+                    (VIDEO_WIDTH, VIDEO_HEIGHT),
+                    style_options["overlay_darkness"],
+                    style_options["overlay_blur"],
+                )
+                background_path = os.path.join(work_dir, "background.png")
+                background.convert("RGB").save(background_path, compress_level=1)
+
+        report(20, "2️⃣ 장면 생성 중...")
+        # 화면이 같은 오버레이는 PNG 하나로 묶고 표시 구간만 여러 개 지정
+        overlays = {}
+        with metrics.stage("overlays"):
+            for i in range(len(lines)):
+                overlay_img = create_text_overlay(
+                    title,
+                    lines,
+                    i,
+                    **{**style_options, "overlay_darkness": 0, "overlay_blur": 0},
+                    video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+                )
+                digest = hashlib.sha1(overlay_img.tobytes()).hexdigest()
+                if digest not in overlays:
+                    overlay_path = os.path.join(work_dir, f"overlay-{len(overlays)}.png")
+                    overlay_img.save(overlay_path, compress_level=1)
+                    overlays[digest] = (overlay_path, [])
+                overlays[digest][1].append((i * line_duration, (i + 1) * line_duration))
+                report(20 + int(10 * (i + 1) / len(lines)))
+
+        duration = len(lines) * line_duration
+        audio_track = _prepare_audio(music_path, duration, music_volume, report, metrics, 30)
+
+        report(35, "3️⃣ 인코딩 중...")
+        # 합성/인코딩/음악 입히기가 ffmpeg 한 번에 끝나므로 모두 encode 단계로 기록
+        with metrics.stage("encode"):
+            encode_filtergraph_video(
+                background_path,
+                list(overlays.values()),
+                output_file,
+                duration,
+                line_duration=line_duration,
+                background_is_image=not bg_video_path,
+                darkness=darkness,
+                audio_track=audio_track,
+                profile=profile,
+                on_frames=_frame_progress(report, 35, 99),
+                metrics=metrics,
+            )
+    return output_file
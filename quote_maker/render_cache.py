@@ -0,0 +1,118 @@
+"""완성된 영상 캐시: 결과에 영향을 주는 입력이 모두 같으면 이전 MP4를 그대로 재사용"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+from .caching import shared_cache
+from .config import (
+    AUDIO_CODEC,
+    RENDER_CACHE_DIR,
+    RENDER_CACHE_MAX_BYTES,
+    RENDER_PROFILES,
+    VIDEO_CODEC,
+    VIDEO_FPS,
+    VIDEO_HEIGHT,
+    VIDEO_WIDTH,
+)
+from .ffmpeg import prune_directory
+
+# 렌더링 결과가 달라지도록 파이프라인/코덱 설정을 바꾸면 함께 올려 예전 캐시를 무효화
+RENDER_CACHE_VERSION = 5
+
+_STATS = {"hits": 0, "misses": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def file_digest(path):
+    """파일 내용의 sha1 (경로/수정 시각/크기가 같으면 다시 읽지 않음)"""
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    def compute():
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    return shared_cache("file_digests", 256).get_or_create((path, stat.st_mtime_ns, stat.st_size), compute)
+
+
+def render_cache_key(spec):
+    """작업 명세에서 결과 영상에 영향을 주는 값만 모아 만든 해시 (출력 경로는 제외)"""
+    style = dict(spec.style_options)
+    for name in ("title_font_path", "body_font_path", "brand_font_path"):
+        # 폰트는 경로가 아니라 파일 내용으로 구분 (파일이 없으면 기본 폰트로 그려지므로 None)
+        style[name] = file_digest(style.get(name))
+    payload = {
+        "version": RENDER_CACHE_VERSION,
+        "title": spec.title,
+        "lines": list(spec.lines),
+        "style": style,
+        "background_video": file_digest(spec.bg_video_path),
+        "background_image": file_digest(spec.bg_image_path),
+        "music": file_digest(spec.music_path),
+        "music_volume": spec.music_volume if spec.music_path else None,
+        "line_duration": spec.line_duration,
+        "size": [VIDEO_WIDTH, VIDEO_HEIGHT],
+        "fps": VIDEO_FPS,
+        "codecs": [VIDEO_CODEC, AUDIO_CODEC],
+        "backend": spec.backend,
+        "profile": {name: value for name, value in RENDER_PROFILES[spec.profile].items() if name != "label"},
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(RENDER_CACHE_DIR, f"{key}.mp4")
+
+
+def _link_or_copy(src, dst):
+    """같은 파일 시스템이면 하드 링크, 아니면 복사 (캐시에서 지워져도 dst는 남음)"""
+    tmp_path = f"{dst}.{uuid.uuid4().hex}.tmp.mp4"
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def fetch_cached_render(key, output_file):
+    """캐시에 있으면 output_file로 꺼내 True 반환 (적중/실패 횟수 집계)"""
+    cached_path = _cache_path(key)
+    try:
+        _link_or_copy(cached_path, output_file)
+        os.utime(cached_path)
+        hit = True
+    except OSError:
+        hit = False
+    with _STATS_LOCK:
+        _STATS["hits" if hit else "misses"] += 1
+    return hit
+
+
+def store_render(key, output_file):
+    """완성된 영상을 캐시에 넣고, 캐시 폴더가 RENDER_CACHE_MAX_BYTES를 넘으면 오래 안 쓴 것부터 삭제"""
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    _link_or_copy(output_file, _cache_path(key))
+    prune_directory(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES)
+
+
+def render_cache_stats():
+    """이 프로세스에서의 캐시 적중/실패 횟수"""
+    with _STATS_LOCK:
+        return dict(_STATS)
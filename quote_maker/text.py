@@ -0,0 +1,472 @@
+"""텍스트 렌더링 엔진: 폰트 캐시, 줄바꿈 측정, 배치(layout), 조각(sprite) 렌더러"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .background import prepare_image_background
+from .caching import LRUCache, shared_cache
+from .config import FOOTER_BRAND, VIDEO_HEIGHT, VIDEO_WIDTH
+
+
+def hex_to_rgba(hex_color, alpha=255):
+    """#RRGGBB 형태를 RGBA 튜플로 변환"""
+    hex_color = hex_color.lstrip("#")
+    if len(hex_color) != 6:
+        return (255, 255, 255, alpha)
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+    return (r, g, b, alpha)
+
+
+class FontCache:
+    """(경로, 크기)별 폰트 객체를 공유하는 캐시. 열 수 없는 폰트 파일은 한 번만 시도하고 기록"""
+
+    def __init__(self, maxsize=64):
+        self._fonts = LRUCache(maxsize)
+        self._missing = set()
+        self._lock = threading.Lock()
+        self._default = None
+
+    def get(self, path, size):
+        """폰트를 반환하고, 열 수 없는 폰트면 None"""
+        if path in self._missing:
+            return None
+        try:
+            return self._fonts.get_or_create((path, size), lambda: ImageFont.truetype(path, size))
+        except OSError:
+            # 파일을 열 수 없을 때만 경로를 기록 (잘못된 크기 등은 다른 크기까지 막지 않음)
+            with self._lock:
+                self._missing.add(path)
+            return None
+        except ValueError:
+            return None
+
+    def default(self):
+        """Pillow 기본 폰트 (한 번만 로드)"""
+        if self._default is None:
+            self._default = ImageFont.load_default()
+        return self._default
+
+    def clear(self):
+        self._fonts.clear()
+        with self._lock:
+            self._missing.clear()
+
+
+# 프로세스 전체에서 공유하는 폰트 캐시
+_FONT_CACHE = FontCache()
+
+
+def default_font():
+    """폰트를 열 수 없을 때 쓰는 기본 폰트"""
+    return _FONT_CACHE.default()
+
+
+def load_font(path, size, fallback):
+    """폰트 로드 (캐시 사용, 실패하면 fallback)"""
+    font = _FONT_CACHE.get(path, size)
+    return font if font is not None else fallback
+
+
+class TextMeasurer:
+    """폰트별 글자 폭(커닝 포함)을 캐시하고, 누적 폭으로 줄바꿈 위치를 계산"""
+
+    def __init__(self, font):
+        self.font = font
+        self._advances = {}
+        self._kerning = {}
+        self._widths = LRUCache(1024)
+
+    def advance(self, ch):
+        """글자 하나의 진행 폭"""
+        value = self._advances.get(ch)
+        if value is None:
+            value = self._advances[ch] = self.font.getlength(ch)
+        return value
+
+    def kerning(self, left, right):
+        """두 글자 사이의 커닝 보정값"""
+        pair = left + right
+        value = self._kerning.get(pair)
+        if value is None:
+            value = self._kerning[pair] = self.font.getlength(pair) - self.advance(left) - self.advance(right)
+        return value
+
+    def width(self, text):
+        """실제 그려지는 폭 (draw.textbbox((0, 0), text)와 같은 값)"""
+
+        def measure():
+            left, _, right, _ = self.font.getbbox(text)
+            return right - left
+
+        return self._widths.get_or_create(text, measure)
+
+    def wrap(self, tokens, joiner, max_width):
+        """토큰을 앞에서부터 채워 폭이 max_width 이하가 되도록 나눈 줄 목록 (첫 토큰은 항상 배치)"""
+        text = joiner.join(tokens)
+        # 글자별 누적 진행 폭 (앞 글자와의 커닝 포함)
+        cumulative = [0.0]
+        for index, ch in enumerate(text):
+            step = self.advance(ch)
+            if index:
+                step += self.kerning(text[index - 1], ch)
+            cumulative.append(cumulative[-1] + step)
+
+        starts = []
+        end_widths = []
+        offset = 0
+        for token in tokens:
+            starts.append(offset)
+            offset += len(token)
+            end_widths.append(cumulative[offset])
+            offset += len(joiner)
+
+        def fits(first, last):
+            return self.width(joiner.join(tokens[first:last])) <= max_width
+
+        lines = []
+        start = 0
+        while start < len(tokens):
+            # 누적 폭으로 후보 위치를 이분 탐색한 뒤 실제 폭으로 경계만 확인
+            line_left = cumulative[starts[start]]
+            if starts[start]:
+                line_left += self.kerning(text[starts[start] - 1], text[starts[start]])
+            end = max(start + 1, bisect.bisect_right(end_widths, line_left + max_width, start, len(tokens)))
+            while end > start + 1 and not fits(start, end):
+                end -= 1
+            while end < len(tokens) and fits(start, end + 1):
+                end += 1
+            lines.append(tokens[start:end])
+            start = end
+        return lines
+
+
+def text_measurer(font):
+    """폰트(경로, 크기)별로 공유하는 측정기"""
+    path = getattr(font, "path", None)
+    key = (path, font.size) if isinstance(path, str) else id(font)
+    return shared_cache("text_measurers", 64).get_or_create(key, lambda: TextMeasurer(font))
+
+
+def _wrap_title(title_text, font, max_width):
+    measurer = text_measurer(font)
+    if " " in title_text:
+        words = title_text.split()
+        if not words:
+            words = [title_text]
+        lines = measurer.wrap(words, " ", max_width)
+    else:
+        lines = measurer.wrap(list(title_text), "", max_width)
+
+    # 2줄까지만 사용
+    if len(lines) > 2:
+        all_tokens = [token for line in lines for token in line]
+        mid = len(all_tokens) // 2
+        lines = [all_tokens[:mid], all_tokens[mid:]]
+
+    return lines
+
+
+def _wrap_body_line(line, font, max_width):
+    """본문 한 줄을 글자 단위로 줄바꿈"""
+    return ["".join(chars) for chars in text_measurer(font).wrap(list(line), "", max_width)]
+
+
+@dataclass(frozen=True, slots=True)
+class TextRun:
+    """위치와 스타일이 정해진 텍스트 한 조각"""
+
+    text: str
+    xy: tuple
+    font: object
+    fill: tuple
+    anchor: str
+    stroke_width: int
+    stroke_fill: tuple
+    bbox: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class SceneLayout:
+    """제목/브랜드/본문의 배치 결과. 강조 상태와 무관하게 한 번만 계산"""
+
+    size: tuple
+    intro_runs: tuple
+    header_runs: tuple
+    body_runs: tuple
+
+
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+
+def _text_run(xy, text, font, fill, anchor, stroke_width, stroke_fill):
+    bbox = _MEASURE_DRAW.textbbox(xy, text, font=font, anchor=anchor, stroke_width=stroke_width)
+    return TextRun(text, xy, font, fill, anchor, stroke_width, stroke_fill, bbox)
+
+
+def build_scene_layout(
+    title,
+    lines,
+    *,
+    title_font_path,
+    body_font_path,
+    brand_font_path,
+    title_size=160,
+    body_size=60,
+    colors=None,
+    video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+    brand_text=FOOTER_BRAND,
+):
+    """제목/브랜드/본문 줄바꿈과 위치를 계산한 SceneLayout 생성"""
+    colors = colors or {}
+    title_color = hex_to_rgba(colors.get("title", "#FFD600"))
+    body_color = hex_to_rgba(colors.get("body", "#FFFFFF"))
+    brand_color = hex_to_rgba(colors.get("brand", "#FF9800"))
+    stroke_fill = (0, 0, 0, 255)
+    title_stroke = max(3, title_size // 25)
+    body_stroke = max(2, body_size // 25)
+
+    font_body = load_font(body_font_path, body_size, default_font())
+    font_brand = load_font(brand_font_path, max(int(body_size * 1.4), 80), default_font())
+    brand_x = video_size[0] / 2
+    max_title_width = int(video_size[0] * 0.85)
+    title_joiner = " " if " " in title else ""
+
+    # 인트로(-1): 제목만 중앙에, 본문 숨김
+    font_title = load_font(title_font_path, int(title_size * 1.2), default_font())
+    title_lines = _wrap_title(title, font_title, max_title_width)
+    line_height = int(font_title.size * 1.25)
+    title_block_height = len(title_lines) * line_height
+    title_block_top_y = (video_size[1] / 2) - (title_block_height / 2)
+    title_start_y = title_block_top_y + (line_height / 2)
+
+    intro_runs = []
+    if brand_text:
+        intro_runs.append(
+            _text_run((brand_x, title_block_top_y - 200), brand_text, font_brand, brand_color, "mm", body_stroke, stroke_fill)
+        )
+    for i, tokens in enumerate(title_lines):
+        text_y = title_start_y + (i * line_height)
+        intro_runs.append(
+            _text_run((video_size[0] / 2, text_y), title_joiner.join(tokens), font_title, title_color, "mm", title_stroke, stroke_fill)
+        )
+
+    # 재생 구간: 제목 상단, 브랜드 하단
+    font_title = load_font(title_font_path, title_size, default_font())
+    title_lines = _wrap_title(title, font_title, max_title_width)
+    title_y = 240
+    line_height = int(font_title.size * 1.15)
+    last_title_bottom = title_y
+    header_runs = []
+    for i, tokens in enumerate(title_lines):
+        text_y = title_y + (i * line_height)
+        run = _text_run((video_size[0] / 2, text_y), title_joiner.join(tokens), font_title, title_color, "mm", title_stroke, stroke_fill)
+        last_title_bottom = run.bbox[3]
+        header_runs.append(run)
+    if brand_text:
+        header_runs.append(
+            _text_run((brand_x, video_size[1] - 120), brand_text, font_brand, brand_color, "mm", body_stroke, stroke_fill)
+        )
+
+    # 본문
+    margin_left = 60
+    line_spacing = int(body_size * 1.7)
+    current_y = last_title_bottom + 60
+    stroke_w = max(1, body_stroke - 1)
+    body_runs = []
+    for i, line in enumerate(lines):
+        number_run = _text_run((margin_left, current_y), f"{i+1}.", font_body, body_color, "lt", stroke_w, stroke_fill)
+        runs = [number_run]
+        max_width = video_size[0] - number_run.bbox[2] - 80
+        text_lines = _wrap_body_line(line, font_body, max_width)
+        text_y = current_y
+        for line_text in text_lines:
+            runs.append(_text_run((number_run.bbox[2] + 20, text_y), line_text, font_body, body_color, "lt", stroke_w, stroke_fill))
+            text_y += 80
+        body_runs.append(tuple(runs))
+
+        current_y += line_spacing if len(text_lines) == 1 else line_spacing + int(0.8 * line_height) * (len(text_lines) - 1)
+
+    return SceneLayout(tuple(video_size), tuple(intro_runs), tuple(header_runs), tuple(body_runs))
+
+
+class SceneRenderer:
+    """SceneLayout을 그리는 렌더러. 제목/브랜드 레이어와 본문 줄은 한 번 그린 조각을 붙여넣기로 재사용"""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self._sprites = {}
+        self._lock = threading.Lock()
+
+    def _sprite(self, key, runs):
+        """runs를 투명 조각 이미지로 그려 (이미지, 위치)로 캐시"""
+        with self._lock:
+            if key in self._sprites:
+                return self._sprites[key]
+        if not runs:
+            sprite = None
+        else:
+            width, height = self.layout.size
+            # 소수 좌표/스트로크 여유를 두고 화면 안쪽으로 자름
+            left = max(0, int(min(run.bbox[0] for run in runs)) - 2)
+            top = max(0, int(min(run.bbox[1] for run in runs)) - 2)
+            right = min(width, int(max(run.bbox[2] for run in runs)) + 3)
+            bottom = min(height, int(max(run.bbox[3] for run in runs)) + 3)
+            if right <= left or bottom <= top:
+                sprite = None
+            else:
+                image = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+                draw = ImageDraw.Draw(image)
+                for run in runs:
+                    draw.text(
+                        (run.xy[0] - left, run.xy[1] - top),
+                        run.text,
+                        font=run.font,
+                        fill=run.fill,
+                        anchor=run.anchor,
+                        stroke_width=run.stroke_width,
+                        stroke_fill=run.stroke_fill,
+                    )
+                sprite = (image, (left, top))
+        with self._lock:
+            self._sprites[key] = sprite
+        return sprite
+
+    def state_key(self, highlight_idx):
+        """draw 결과를 가르는 상태 (인트로/본문). 상태가 같으면 그린 결과도 같음"""
+        return "intro" if highlight_idx == -1 else "body"
+
+    def draw(self, canvas, highlight_idx, visible_lines=None):
+        """canvas 위에 highlight_idx 상태의 텍스트를 합성 (visible_lines가 없으면 본문 전체)"""
+        if highlight_idx == -1:
+            parts = [self._sprite("intro", self.layout.intro_runs)]
+        else:
+            if visible_lines is None:
+                visible_lines = range(len(self.layout.body_runs))
+            parts = [self._sprite("header", self.layout.header_runs)]
+            parts.extend(self._sprite(("body", i), self.layout.body_runs[i]) for i in visible_lines)
+
+        for part in parts:
+            if part is not None:
+                image, position = part
+                canvas.alpha_composite(image, position)
+        return canvas
+
+
+def scene_renderer(title, lines, **layout_options):
+    """같은 제목/본문/스타일이면 배치와 그려 둔 조각을 재사용하는 렌더러"""
+    colors = layout_options.get("colors") or {}
+    cache_key = (
+        title,
+        tuple(lines),
+        tuple(sorted(colors.items())),
+        tuple(sorted((name, value) for name, value in layout_options.items() if name != "colors")),
+    )
+    return shared_cache("scene_renderers", 16).get_or_create(
+        cache_key,
+        lambda: SceneRenderer(build_scene_layout(title, lines, **layout_options)),
+    )
+
+
+class TextSurface(ABC):
+    """텍스트를 합성할 바탕. 백엔드마다 캔버스 준비와 최종 변환 방식이 다름"""
+
+    @abstractmethod
+    def new_canvas(self):
+        """텍스트를 그릴 새 RGBA 캔버스"""
+
+    def finish(self, canvas):
+        return canvas
+
+
+class OverlaySurface(TextSurface):
+    """영상용: 투명(또는 균일하게 어두운) RGBA 레이어"""
+
+    def __init__(self, size, darkness=0):
+        self.size = tuple(size)
+        self.darkness = int(darkness) if darkness > 0 else 0
+
+    def new_canvas(self):
+        return Image.new("RGBA", self.size, (0, 0, 0, self.darkness))
+
+
+class ImageSurface(TextSurface):
+    """이미지 배경용: 준비된 배경 위에 텍스트를 합성한 RGB 프레임"""
+
+    def __init__(self, background):
+        self.background = background
+
+    def new_canvas(self):
+        return self.background.copy()
+
+    def finish(self, canvas):
+        return canvas.convert("RGB")
+
+
+def render_text_scene(
+    title,
+    lines,
+    highlight_idx,
+    surface,
+    *,
+    title_font_path,
+    body_font_path,
+    brand_font_path,
+    title_size=160,
+    body_size=60,
+    colors=None,
+    video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+    brand_text=FOOTER_BRAND,
+):
+    """공통 텍스트 렌더링: 캐시된 배치/조각으로 surface 위에 highlight_idx 상태를 그림"""
+    renderer = scene_renderer(
+        title,
+        lines,
+        title_font_path=title_font_path,
+        body_font_path=body_font_path,
+        brand_font_path=brand_font_path,
+        title_size=title_size,
+        body_size=body_size,
+        colors=colors,
+        video_size=tuple(video_size),
+        brand_text=brand_text,
+    )
+    return surface.finish(renderer.draw(surface.new_canvas(), highlight_idx))
+
+
+def create_text_overlay(
+    title,
+    lines,
+    highlight_idx,
+    *,
+    overlay_darkness=140,
+    overlay_blur=0,
+    video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+    **text_options,
+):
+    """영상 위에 깔 투명 텍스트 레이어 생성"""
+    # 균일한 레이어라 흐림(overlay_blur)은 결과에 영향이 없어 적용하지 않음.
+    # 배경 자체의 어둡게/흐림 처리는 prepare_*_background 단계에서 한 번만 수행
+    surface = OverlaySurface(video_size, overlay_darkness)
+    return render_text_scene(title, lines, highlight_idx, surface, video_size=video_size, **text_options)
+
+
+def create_text_image(
+    base_img_path,
+    title,
+    lines,
+    highlight_idx,
+    *,
+    overlay_blur=5,
+    overlay_darkness=140,
+    video_size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+    **text_options,
+):
+    """이미지 위에 텍스트 합성"""
+    surface = ImageSurface(prepare_image_background(base_img_path, video_size, overlay_darkness, overlay_blur))
+    return render_text_scene(title, lines, highlight_idx, surface, video_size=video_size, **text_options)
@@ -0,0 +1,516 @@
+"""프레임 합성과 구간 인코딩/이어 붙이기"""
+
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .background import BackgroundFrameStore
+from .config import (
+    DEFAULT_RENDER_PROFILE,
+    RENDER_PROFILES,
+    SEGMENT_CACHE_MAX_BYTES,
+    SEGMENT_DIR,
+    SEGMENT_WORKERS,
+    TEMP_DIR,
+    VIDEO_CODEC,
+    VIDEO_FPS,
+    VIDEO_HEIGHT,
+    VIDEO_WIDTH,
+)
+from .ffmpeg import prune_directory, run_ffmpeg, run_ffmpeg_with_frames, run_ffmpeg_with_progress
+from .metrics import cpu_seconds
+
+
+class OverlayCompositor:
+    """구간 내내 고정된 RGBA 오버레이를 배경 프레임에 NumPy로 직접 합성"""
+
+    def __init__(self, overlay_img):
+        overlay_img = overlay_img.convert("RGBA")
+        # 완전히 투명한 영역은 건드리지 않도록 불투명 픽셀의 경계만 합성
+        bbox = overlay_img.getchannel("A").getbbox()
+        region = None
+        if bbox is not None:
+            x0, y0, x1, y1 = bbox
+            region = np.asarray(overlay_img)[y0:y1, x0:x1]
+        self._init_region(bbox, region)
+
+    @classmethod
+    def from_compact(cls, compact):
+        """compact()로 받은 (bbox, 영역)에서 복원 (다른 프로세스에서 사용)"""
+        compositor = cls.__new__(cls)
+        compositor._init_region(*compact)
+        return compositor
+
+    def _init_region(self, bbox, region):
+        self.bbox = bbox
+        self._region = region
+        self._frame = None
+        self._scratch = None
+        if bbox is None:
+            return
+
+        alpha = region[:, :, 3:4].astype(np.uint16)
+        # 미리 곱한 색(+반올림 값)과 역 알파를 한 번만 계산
+        self._premultiplied = region[:, :, :3].astype(np.uint16) * alpha + 127
+        self._inverse_alpha = 255 - alpha
+
+    def compact(self):
+        """다른 프로세스로 넘길 (bbox, 불투명 영역 RGBA 배열). 전체 화면 대신 글자 영역만 담음"""
+        return self.bbox, self._region
+
+    def composite(self, frame):
+        """배경 프레임 위에 오버레이를 합성한 프레임 (내부 버퍼를 재사용)"""
+        if self._frame is None or self._frame.shape != frame.shape:
+            self._frame = np.empty(frame.shape, dtype=np.uint8)
+        np.copyto(self._frame, frame)
+        if self.bbox is None:
+            return self._frame
+
+        x0, y0, x1, y1 = self.bbox
+        region = self._frame[y0:y1, x0:x1]
+        if self._scratch is None:
+            self._scratch = np.empty(region.shape, dtype=np.uint16)
+        scratch = self._scratch
+        np.multiply(region, self._inverse_alpha, out=scratch)
+        np.add(scratch, self._premultiplied, out=scratch)
+        np.floor_divide(scratch, 255, out=scratch)
+        np.copyto(region, scratch, casting="unsafe")
+        return self._frame
+
+
+def _profile_settings(profile):
+    """프로필 이름의 인코딩 설정과 캐시 키에 넣을 문자열"""
+    settings = RENDER_PROFILES[profile]
+    key = "|".join(f"{name}={settings[name]}" for name in ("preset", "crf", "pix_fmt", "scale"))
+    return settings, key
+
+
+def _profile_scale_filter(settings, width, height):
+    """프로필 해상도 배율에 맞춘 scale 필터 (배율 1이면 None)"""
+    if settings["scale"] == 1.0:
+        return None
+    scaled_width = max(2, int(width * settings["scale"]) // 2 * 2)
+    scaled_height = max(2, int(height * settings["scale"]) // 2 * 2)
+    return f"scale={scaled_width}:{scaled_height}:flags=area"
+
+
+def _profile_codec_args(settings):
+    return [
+        "-c:v", VIDEO_CODEC,
+        "-preset", settings["preset"],
+        "-crf", str(settings["crf"]),
+        "-threads", str(settings["threads"]),
+        "-pix_fmt", settings["pix_fmt"],
+    ]
+
+
+def encode_still_segment(frame, duration, fps=VIDEO_FPS, profile=DEFAULT_RENDER_PROFILE, metrics=None):
+    """정지 화면 한 장을 duration초 구간 영상으로 인코딩 (같은 화면/길이/프로필이면 캐시 재사용)
+
+    metrics(RenderMetrics)가 있으면 새로 인코딩한 프레임 수를 더한다.
+    """
+    settings, profile_key = _profile_settings(profile)
+    frame = np.ascontiguousarray(frame[:, :, :3], dtype=np.uint8)
+    height, width = frame.shape[:2]
+    digest = hashlib.sha1(frame.tobytes())
+    digest.update(f"{width}x{height}|{duration}|{fps}|{profile_key}".encode("utf-8"))
+    segment_path = os.path.join(SEGMENT_DIR, f"still-{digest.hexdigest()[:20]}.mp4")
+    if os.path.exists(segment_path):
+        os.utime(segment_path)
+        return segment_path
+
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+    frame_count = max(1, int(round(duration * fps)))
+    filters = [f"loop=loop={frame_count - 1}:size=1:start=0,setpts=N/({fps}*TB)"]
+    scale_filter = _profile_scale_filter(settings, width, height)
+    if scale_filter:
+        filters.append(scale_filter)
+    tmp_path = f"{segment_path}.{uuid.uuid4().hex}.tmp.mp4"
+    try:
+        # 프레임 한 장만 넘기고 ffmpeg 안에서 반복
+        run_ffmpeg(
+            [
+                "-f", "rawvideo",
+                "-pix_fmt", "rgb24",
+                "-s", f"{width}x{height}",
+                "-r", str(fps),
+                "-i", "pipe:0",
+                "-vf", ",".join(filters),
+                "-frames:v", str(frame_count),
+                "-r", str(fps),
+                *_profile_codec_args(settings),
+                "-tune", "stillimage",
+                tmp_path,
+            ],
+            input_bytes=frame.tobytes(),
+        )
+        os.replace(tmp_path, segment_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if metrics is not None:
+        metrics.add_frames(frame_count)
+
+    prune_directory(SEGMENT_DIR, SEGMENT_CACHE_MAX_BYTES)
+    return segment_path
+
+
+def _overlay_segment_path(overlay_img, background_key, duration, fps, profile_key):
+    width, height = overlay_img.size
+    digest = hashlib.sha1(overlay_img.tobytes())
+    digest.update(f"{background_key}|{width}x{height}|{duration}|{fps}|{profile_key}".encode("utf-8"))
+    return os.path.join(SEGMENT_DIR, f"overlay-{digest.hexdigest()[:20]}.mp4")
+
+
+def _encode_overlay_frames(compositor, background_store, segment_path, duration, fps, profile, on_frame=None):
+    """배경 프레임에 오버레이를 합성하면서 바로 ffmpeg로 넘겨 segment_path에 저장
+
+    on_frame(frames)는 프레임을 하나 넘길 때마다 호출되고, 반환값은 {"frames", "composite_s", "composite_cpu_s"}.
+    """
+    settings, _ = _profile_settings(profile)
+    height, width = background_store.frames.shape[1:3]
+    frame_count = max(1, int(round(duration * fps)))
+    stats = {"frames": frame_count, "composite_s": 0.0, "composite_cpu_s": 0.0}
+
+    def frames():
+        for i in range(frame_count):
+            # 쓰기 스레드와 ffmpeg의 CPU는 빼고 이 스레드의 합성 CPU만 잼
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            frame = compositor.composite(background_store.get_frame(i / fps))
+            stats["composite_s"] += time.perf_counter() - started
+            stats["composite_cpu_s"] += time.thread_time() - started_cpu
+            yield frame
+            if on_frame is not None:
+                on_frame(i + 1)
+
+    os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+    scale_filter = _profile_scale_filter(settings, width, height)
+    tmp_path = f"{segment_path}.{uuid.uuid4().hex}.tmp.mp4"
+    try:
+        # 구간마다 따로 디코딩 가능한 조각으로 저장
+        run_ffmpeg_with_frames(
+            [
+                "-f", "rawvideo",
+                "-pix_fmt", "rgb24",
+                "-s", f"{width}x{height}",
+                "-r", str(fps),
+                "-i", "pipe:0",
+                *(["-vf", scale_filter] if scale_filter else []),
+                "-frames:v", str(frame_count),
+                *_profile_codec_args(settings),
+                tmp_path,
+            ],
+            frames(),
+        )
+        os.replace(tmp_path, segment_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return stats
+
+
+def _encode_shared_overlay_segment(
+    background_descriptor, compact_overlay, segment_path, duration, fps, profile, counter_descriptor=None
+):
+    """구간 인코딩 프로세스에서 실행: 공유 메모리의 배경 프레임을 그대로 읽어 인코딩
+
+    counter_descriptor(공유 메모리 이름, 칸 번호)가 있으면 넘긴 프레임 수를 그 칸에 기록한다.
+    반환값은 {"frames", "composite_s", "composite_cpu_s", "cpu_s"} (cpu_s는 이 프로세스와 ffmpeg가 쓴 CPU 시간).
+    """
+    from multiprocessing import shared_memory
+
+    started_cpu = cpu_seconds()
+    counter_memory = counts = None
+    on_frame = None
+    if counter_descriptor is not None:
+        name, slot = counter_descriptor
+        counter_memory = shared_memory.SharedMemory(name=name)
+        counts = np.ndarray((slot + 1,), dtype=np.int64, buffer=counter_memory.buf)
+
+        def on_frame(frames):
+            counts[slot] = frames
+
+    try:
+        with BackgroundFrameStore.attach_shared(background_descriptor) as background_store:
+            compositor = OverlayCompositor.from_compact(compact_overlay)
+            stats = _encode_overlay_frames(compositor, background_store, segment_path, duration, fps, profile, on_frame)
+    finally:
+        if counter_memory is not None:
+            # 버퍼를 참조하는 배열을 먼저 놓아야 공유 메모리를 닫을 수 있음
+            counts = on_frame = None
+            counter_memory.close()
+    stats["cpu_s"] = cpu_seconds() - started_cpu
+    return stats
+
+
+_SEGMENT_POOL = None
+_SEGMENT_POOL_LOCK = threading.Lock()
+
+
+def _segment_pool():
+    """구간 인코딩용 프로세스 풀 (프로세스 안에서 한 번 만들어 계속 재사용)"""
+    global _SEGMENT_POOL
+    with _SEGMENT_POOL_LOCK:
+        if _SEGMENT_POOL is None:
+            _SEGMENT_POOL = ProcessPoolExecutor(
+                max_workers=SEGMENT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _SEGMENT_POOL
+
+
+def _discard_segment_pool(pool):
+    """프로세스가 죽어 못 쓰게 된 풀을 버림 (다음 _segment_pool() 호출 때 새로 만듦)"""
+    global _SEGMENT_POOL
+    with _SEGMENT_POOL_LOCK:
+        if _SEGMENT_POOL is pool:
+            _SEGMENT_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def encode_overlay_segments(
+    overlay_imgs,
+    background_key,
+    load_background,
+    duration,
+    fps=VIDEO_FPS,
+    profile=DEFAULT_RENDER_PROFILE,
+    workers=SEGMENT_WORKERS,
+    on_frames=None,
+    metrics=None,
+):
+    """오버레이마다 배경 영상 위에 입힌 duration초 구간을 인코딩하고 구간 경로 목록 반환
+
+    같은 오버레이/배경/길이/프로필의 구간은 캐시를 재사용하고, 새로 만들 구간이 여럿이면
+    배경 프레임을 공유 메모리에 한 번 올린 뒤 workers개 프로세스에서 동시에 인코딩한다.
+    background_key는 배경 영상과 어둡게 처리 값을 구분하는 문자열이고,
+    load_background()는 새로 만들 구간이 있을 때만 호출되어 BackgroundFrameStore를 돌려준다.
+    on_frames(완료 프레임 수, 전체 프레임 수)는 새 구간을 인코딩하는 동안 수시로 호출되고,
+    metrics(RenderMetrics)가 있으면 인코딩한 프레임 수, 합성 시간("composite"), 인코딩 프로세스의 CPU 시간을 더한다.
+
+    지금의 render_video()는 본문 줄마다 같은 오버레이를 넘기므로 새 구간이 하나뿐이라 병렬 경로를 타지 않는다.
+    병렬 경로는 서로 다른 오버레이를 넘기는 호출(벤치마크의 encode_segments 등)에서 쓰인다.
+    """
+    _, profile_key = _profile_settings(profile)
+    overlay_imgs = [overlay_img.convert("RGBA") for overlay_img in overlay_imgs]
+    segment_paths = [_overlay_segment_path(img, background_key, duration, fps, profile_key) for img in overlay_imgs]
+
+    missing = {}
+    for segment_path, overlay_img in zip(segment_paths, overlay_imgs):
+        if segment_path in missing:
+            continue
+        if os.path.exists(segment_path):
+            os.utime(segment_path)
+        else:
+            missing[segment_path] = overlay_img
+    if not missing:
+        return segment_paths
+
+    report = on_frames or (lambda done, total: None)
+    frame_count = max(1, int(round(duration * fps)))
+    total_frames = frame_count * len(missing)
+
+    def add_stats(stats, concurrency=1):
+        if metrics is not None:
+            metrics.add_frames(stats["frames"])
+            # 여러 프로세스가 동시에 합성하면 벽시계 시간은 동시 실행 수로 나눈 몫만 이 렌더링에 해당
+            metrics.add_time("composite", stats["composite_s"] / concurrency, stats["composite_cpu_s"])
+            if "cpu_s" in stats:
+                metrics.add_cpu(stats["cpu_s"])
+
+    background_store = load_background()
+    compositors = {segment_path: OverlayCompositor(img) for segment_path, img in missing.items()}
+    shared = None
+    if workers > 1 and len(missing) > 1:
+        try:
+            shared = background_store.share()
+        except OSError:
+            # 공유 메모리를 쓸 수 없거나 자리가 모자라면 순서대로 인코딩
+            shared = None
+
+    def encode_sequentially(pending, done_segments=0):
+        for index, (segment_path, compositor) in enumerate(pending.items(), done_segments):
+            stats = _encode_overlay_frames(
+                compositor,
+                background_store,
+                segment_path,
+                duration,
+                fps,
+                profile,
+                on_frame=lambda frames, base=index * frame_count: report(base + frames, total_frames),
+            )
+            add_stats(stats)
+
+    if shared is None:
+        encode_sequentially(compositors)
+    else:
+        from multiprocessing import shared_memory
+
+        memory, descriptor = shared
+        counter_memory = counts = None
+        leftover = None
+        try:
+            # 인코딩 프로세스마다 넘긴 프레임 수를 적는 칸 (진행률을 실제 프레임 수로 계산)
+            counter_memory = shared_memory.SharedMemory(create=True, size=8 * len(compositors))
+            counts = np.ndarray((len(compositors),), dtype=np.int64, buffer=counter_memory.buf)
+            counts[:] = 0
+            pool = _segment_pool()
+            futures = []
+            try:
+                for slot, (segment_path, compositor) in enumerate(compositors.items()):
+                    futures.append(
+                        pool.submit(
+                            _encode_shared_overlay_segment,
+                            descriptor,
+                            compositor.compact(),
+                            segment_path,
+                            duration,
+                            fps,
+                            profile,
+                            (counter_memory.name, slot),
+                        )
+                    )
+                pending = set(futures)
+                while pending:
+                    finished, pending = wait(pending, timeout=0.25)
+                    for future in finished:
+                        add_stats(future.result(), min(workers, len(futures)))
+                    report(int(counts.sum()), total_frames)
+            except BrokenProcessPool:
+                # 인코딩 프로세스가 비정상 종료되면(메모리 부족 등) 풀을 버리고 남은 구간은 이 프로세스에서 순서대로 인코딩
+                _discard_segment_pool(pool)
+                leftover = {path: compositor for path, compositor in compositors.items() if not os.path.exists(path)}
+            except BaseException:
+                # 실패/취소 시 아직 시작하지 않은 구간은 인코딩하지 않음
+                for future in futures:
+                    future.cancel()
+                raise
+        finally:
+            memory.close()
+            memory.unlink()
+            if counter_memory is not None:
+                counts = None
+                counter_memory.close()
+                counter_memory.unlink()
+        if leftover:
+            encode_sequentially(leftover, len(compositors) - len(leftover))
+
+    prune_directory(SEGMENT_DIR, SEGMENT_CACHE_MAX_BYTES)
+    return segment_paths
+
+
+def encode_filtergraph_video(
+    background_path,
+    overlays,
+    output_file,
+    duration,
+    *,
+    line_duration=None,
+    background_is_image=False,
+    darkness=0,
+    fps=VIDEO_FPS,
+    audio_track=None,
+    profile=DEFAULT_RENDER_PROFILE,
+    on_frames=None,
+    metrics=None,
+):
+    """배경 크기 맞춤/반복/어둡게, 오버레이 합성, 인코딩까지 ffmpeg 필터그래프 한 번으로 처리
+
+    overlays는 [(RGBA PNG 경로, [(시작초, 끝초), ...]), ...]이며, 각 PNG는 해당 구간에만 표시된다.
+    영상 배경은 구간 방식과 같게 앞부분 line_duration초(없으면 duration초)만 쓰고 줄이 바뀔 때마다 처음부터 다시 튼다.
+    audio_track은 encode_music_track()으로 만든 음악 트랙(그대로 복사)이다. Python은 프레임을 전혀 다루지 않고,
+    on_frames(완료 프레임 수, 전체 프레임 수)는 ffmpeg의 진행 보고를 그대로 전달한다.
+    """
+    settings, _ = _profile_settings(profile)
+    # 정지 이미지는 한 번만 디코딩하고 loop 필터로 메모리에서 반복 (-loop 1 입력은 매 프레임 다시 디코딩함)
+    still_loop = f"loop=loop=-1:size=1:start=0,setpts=N/({fps}*TB)"
+    args = ["-i", background_path]
+    background_filters = [still_loop] if background_is_image else []
+    for overlay_path, _ in overlays:
+        args += ["-i", overlay_path]
+
+    background_filters += [
+        f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=increase",
+        f"crop={VIDEO_WIDTH}:{VIDEO_HEIGHT}",
+        f"fps={fps}",
+    ]
+    if darkness > 0:
+        # 검은 레이어(알파=darkness)를 덮은 것과 같은 효과: 밝기/색차를 검은색(제한 범위 Y=16, U=V=128) 쪽으로 같은 비율로 당김
+        # (drawbox의 반투명 채우기는 색차를 제대로 섞지 않아 색이 바래 보임)
+        keep = (255 - int(darkness)) / 255
+        background_filters += [
+            "format=yuv420p",
+            f"lutyuv=y='(val-16)*{keep:.4f}+16':u='(val-128)*{keep:.4f}+128':v='(val-128)*{keep:.4f}+128'",
+        ]
+    if not background_is_image:
+        # 앞부분 한 줄 분량의 프레임만 메모리에 두고 반복. 영상이 한 줄보다 짧으면 먼저 영상을 반복해 한 줄 분량을
+        # 채운 뒤 그 묶음을 반복한다 (BackgroundFrameStore.get_frame의 나머지 연산과 같은 순서)
+        # 어둡게 처리 뒤에 두어 반복되는 프레임은 다시 처리하지 않음
+        loop_frames = max(1, int(round((line_duration or duration) * fps)))
+        line_loop = [
+            f"trim=end_frame={loop_frames}",
+            "setpts=PTS-STARTPTS",
+            f"loop=loop=-1:size={loop_frames}:start=0",
+            # loop를 거치면 프레임 속도 정보가 빠져 25fps로 인코딩되므로 시각을 다시 매기고 속도를 명시
+            f"setpts=N/({fps}*TB)",
+            f"fps={fps}",
+        ]
+        background_filters += line_loop + line_loop
+    graph = [f"[0:v]{','.join(background_filters)}[bg0]"]
+    current = "bg0"
+    for index, (_, windows) in enumerate(overlays, 1):
+        enable = "+".join(f"gte(t,{start:.3f})*lt(t,{end:.3f})" for start, end in windows)
+        graph.append(f"[{index}:v]{still_loop}[text{index}]")
+        graph.append(f"[{current}][text{index}]overlay=0:0:enable='{enable}'[bg{index}]")
+        current = f"bg{index}"
+    scale_filter = _profile_scale_filter(settings, VIDEO_WIDTH, VIDEO_HEIGHT)
+    graph.append(f"[{current}]{scale_filter or 'null'}[v]")
+
+    if audio_track:
+        args += ["-i", audio_track]
+    args += ["-filter_complex", ";".join(graph), "-map", "[v]"]
+    if audio_track:
+        args += ["-map", f"{len(overlays) + 1}:a", "-c:a", "copy"]
+    args += [
+        "-t", f"{duration:.3f}",
+        *_profile_codec_args(settings),
+        "-movflags", "+faststart",
+        output_file,
+    ]
+    total_frames = max(1, int(round(duration * fps)))
+    report = on_frames or (lambda done, total: None)
+    run_ffmpeg_with_progress(args, lambda frames: report(min(frames, total_frames), total_frames))
+    if metrics is not None:
+        metrics.add_frames(total_frames)
+    return output_file
+
+
+def concat_segments(segment_paths, output_file, duration, audio_track=None):
+    """구간 영상들을 재인코딩 없이(스트림 복사) 이어 붙이고 음악 트랙(encode_music_track() 결과)을 그대로 복사해 입힘"""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", dir=TEMP_DIR, delete=False, encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+
+    args = ["-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_track:
+        args += ["-i", audio_track]
+    args += ["-map", "0:v", "-c:v", "copy"]
+    if audio_track:
+        args += ["-map", "1:a", "-c:a", "copy"]
+    args += ["-t", f"{duration:.3f}", "-movflags", "+faststart", output_file]
+    try:
+        run_ffmpeg(args)
+    finally:
+        os.remove(list_path)
+    return output_file